@@ -1,7 +1,6 @@
-import os
-import platform
-import subprocess
-import sys
+import time
+
+import_start_time = time.perf_counter()
 
 import bpy
 from bpy.utils import register_class, unregister_class
@@ -18,68 +17,164 @@ bl_info = {
 }
 
 
-# Non standard Python packages - "python import name": "pip install name"
-packages = {
-    "gtts": "gTTS",
-    "openai": "openai",
-    "pydub": "pydub",
-    "reachy_sdk": "reachy-sdk",
-    "requests": "requests",
-    "scipy": "scipy",
-    "sounddevice": "sounddevice",
-    "whisper": "openai-whisper",
-}
+# Heavy dependencies are only imported when a feature is first used, not when the addon is enabled
+from .reachy_dependencies import ENGINE_FEATURES, FEATURES, Installer, missing_packages
+from .reachy_profiling import profiled, profiler
 
+installer = Installer()
 
-def install_package(package):
+# Global objects, created on first use of each feature
+reachy = None
+reachy_gpt = None
+reachy_voice = None
+orchestrator = None
 
-    if platform.system() == "win32":
+load_times = {}  # Feature -> seconds spent importing and initializing it
+missing = {}  # Feature -> pip names of missing packages, shown in the panel
 
-        python_exe = os.path.join(sys.prefix, "bin", "python.exe")
-        target = os.path.join(sys.prefix, "lib", "site-packages")
 
-        subprocess.call([python_exe, "-m", "ensurepip"])
-        subprocess.call([python_exe, "-m", "pip", "install", "--upgrade", "pip"])
+def update_missing_packages():
 
-        subprocess.call(
-            [python_exe, "-m", "pip", "install", "--upgrade", package, "-t", target]
-        )
+    missing.clear()
 
-    else:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+    for feature in FEATURES:
+        packages = missing_packages(feature)
 
+        if len(packages) > 0:
+            missing[feature] = packages
 
-for package_py, package_pip in packages.items():
-    try:
-        exec("import " + package_py)
 
-    except ModuleNotFoundError:
-        print(
-            package_py
-            + " module not found, installing '"
-            + package_pip
-            + "' with pip..."
+def feature_available(feature, report_blender):
+
+    packages = missing_packages(feature)
+
+    if len(packages) > 0:
+        # Listed in the panel, also for features that are not checked at startup
+        missing[feature] = packages
+
+        report_blender(
+            {"ERROR"},
+            "Missing packages for "
+            + feature
+            + ": "
+            + ", ".join(packages)
+            + ". Install them from the addon panel.",
         )
+        return False
+
+    return True
+
+
+def log_load_time(feature, start_time):
+
+    load_times[feature] = time.perf_counter() - start_time
+    print("ReachyMarionette: loaded %s in %.2f s" % (feature, load_times[feature]))
+
+
+def get_reachy(report_blender):
+
+    global reachy
+
+    if reachy is None:
+        if not feature_available("robot", report_blender):
+            return None
+
+        start_time = time.perf_counter()
+        from .reachy_marionette import ReachyMarionette
+
+        reachy = ReachyMarionette()
+        reachy.latency_offset = bpy.context.scene.scn_prop.LatencyOffset
+        log_load_time("robot", start_time)
+
+    return reachy
+
+
+def get_gpt(report_blender):
+
+    global reachy_gpt
+
+    if reachy_gpt is None:
+        if not feature_available("gpt", report_blender):
+            return None
+
+        start_time = time.perf_counter()
+        from .reachy_gpt import ReachyGPT
+
+        reachy_gpt = ReachyGPT()
+        log_load_time("gpt", start_time)
+
+    return reachy_gpt
+
+
+def get_voice(report_blender):
+
+    global reachy_voice
+
+    if reachy_voice is None:
+        if not feature_available("voice", report_blender):
+            return None
+
+        start_time = time.perf_counter()
+        from .reachy_voice import ReachyVoice
+
+        scene_properties = bpy.context.scene.scn_prop
+        threads = scene_properties.TranscriptionThreads or None
+        beam_size = scene_properties.BeamSize or None
+
+        # The engine is saved in the .blend, so it may not be installed on this machine
+        engine = scene_properties.TranscriptionEngine
+        if engine in ENGINE_FEATURES and not feature_available(engine, report_blender):
+            engine = "whisper"
+
+        try:
+            reachy_voice = ReachyVoice(engine, threads=threads, beam_size=beam_size)
+        except ImportError as error:
+            report_blender(
+                {"ERROR"}, "Could not load transcription engine: " + str(error)
+            )
+            engine = "whisper"
+            reachy_voice = ReachyVoice(engine, threads=threads, beam_size=beam_size)
+
+        if scene_properties.TranscriptionEngine != engine:
+            report_blender({"WARNING"}, "Falling back to the Whisper engine.")
+            scene_properties.TranscriptionEngine = engine
+
+        # Apply settings that differ from the defaults
+        if scene_properties.Synthesizer != "gtts":
+            scene_properties.callback_synthesizer(bpy.context)
+
+        log_load_time("voice", start_time)
+
+        if orchestrator is not None:
+            orchestrator.reachy_voice = reachy_voice
+
+    return reachy_voice
 
-        install_package(package_pip)
-        exec("import " + package_py)
 
-        print(package_py + " successfully imported")
+def get_orchestrator(report_blender):
 
-print("All packages installed")
+    global orchestrator
 
-# Load addon modules
-from .reachy_marionette import ReachyMarionette
-from .reachy_gpt import ReachyGPT
-from .reachy_voice import ReachyVoice
+    if orchestrator is None:
+        if get_reachy(report_blender) is None:
+            return None
+
+        from .reachy_orchestrator import ResponseOrchestrator
+
+        orchestrator = ResponseOrchestrator(reachy, reachy_voice)
+
+    return orchestrator
+
+
+def print_report(report_type, message):
+    print(message)
 
-# Global objects
-reachy = ReachyMarionette()
-reachy_gpt = ReachyGPT()
-reachy_voice = ReachyVoice()
 
 # Global constants
 AUDIO_FILE_PATH = "//mic_input.wav"
+PHRASES_TEXT_NAME = "ReachyPhrases"  # Text datablock with one phrase per line
+# Text datablock with report of last profiling session
+PROFILE_TEXT_NAME = "ReachyProfile"
 
 
 # Classes
@@ -106,11 +201,102 @@ class SceneProperties(bpy.types.PropertyGroup):
         if self.Streaming:
             bpy.ops.reachy_marionette.stream_angles("INVOKE_DEFAULT")
 
-            if reachy.reachy == None:
+            if reachy is None or reachy.reachy == None:
                 self.Streaming = False
 
         return
 
+    def callback_latency_offset(self, context):
+
+        if reachy is not None:
+            reachy.latency_offset = self.LatencyOffset
+
+    def callback_control_process(self, context):
+
+        if self.ControlProcess:
+            if get_reachy(print_report) is None or not reachy.bridge_enable(
+                print_report, ip=self.IPaddress
+            ):
+                self.ControlProcess = False
+
+        elif reachy is not None:
+            reachy.bridge_disable(print_report)
+
+    def callback_mirroring(self, context):
+
+        if self.Mirroring:
+            bpy.ops.reachy_marionette.mirror_angles("INVOKE_DEFAULT")
+
+        return
+
+    def callback_teaching(self, context):
+
+        if self.Teaching:
+            bpy.ops.reachy_marionette.teach_pose("INVOKE_DEFAULT")
+
+        return
+
+    def callback_engine(self, context):
+        # Apply new settings, the model is only reloaded for a new engine or thread count
+
+        # Settings are applied when voice is first used
+        if reachy_voice is None:
+            return
+
+        engine = self.TranscriptionEngine
+        if engine in ENGINE_FEATURES and not feature_available(engine, print_report):
+            # Keep the property in sync with the loaded engine
+            self.TranscriptionEngine = reachy_voice.engine.name
+            return
+
+        try:
+            reachy_voice.set_engine(
+                engine,
+                threads=self.TranscriptionThreads or None,
+                beam_size=self.BeamSize or None,
+            )
+        except ImportError as error:
+            print("Could not load transcription engine: " + str(error))
+            self.TranscriptionEngine = reachy_voice.engine.name
+
+    def callback_synthesizer(self, context):
+
+        if reachy_voice is None:
+            return
+
+        try:
+            reachy_voice.set_synthesizer(self.Synthesizer)
+        except ImportError as error:
+            print("Could not load speech synthesizer: " + str(error))
+
+    def callback_profiling(self, context):
+
+        if self.Profiling:
+            profiler.start()
+            print("Profiling started")
+            return
+
+        if not profiler.active:
+            return
+
+        report, paths = profiler.stop()
+
+        text = bpy.data.texts.get(PROFILE_TEXT_NAME)
+        if text is None:
+            text = bpy.data.texts.new(PROFILE_TEXT_NAME)
+
+        text.clear()
+        text.write(report)
+
+        print(
+            "Profiling ended, see the '"
+            + PROFILE_TEXT_NAME
+            + "' text, and "
+            + str(len(paths))
+            + " .prof files in "
+            + profiler.directory
+        )
+
     def callback_recording(self, context):
 
         if self.Recording:
@@ -124,6 +310,33 @@ class SceneProperties(bpy.types.PropertyGroup):
         default="localhost",
     )  # type: ignore (stops warning squiggles)
 
+    Teaching: bpy.props.BoolProperty(
+        description="If addon is currently recording the arms of Reachy being moved by hand.",
+        default=False,
+        update=callback_teaching,
+    )  # type: ignore (stops warning squiggles)
+
+    TeachTolerance: bpy.props.FloatProperty(
+        name="Tolerance",
+        description="Largest deviation (degrees) of keyframes from the recorded motion.",
+        default=1.0,
+        min=0.0,
+        max=10.0,
+    )  # type: ignore (stops warning squiggles)
+
+    Profiling: bpy.props.BoolProperty(
+        description="If operators and the streaming timer are profiled (time and memory).",
+        default=False,
+        update=callback_profiling,
+    )  # type: ignore (stops warning squiggles)
+
+    TrajectoryPath: bpy.props.StringProperty(
+        name="Trajectories",
+        description="File that actions are exported to, for the headless player.",
+        default="//reachy_trajectories.json",
+        subtype="FILE_PATH",
+    )  # type: ignore (stops warning squiggles)
+
     Kinematics: bpy.props.EnumProperty(
         name="Kinematics",
         description="Choose if rig is controlled by forward kinematics (FK) or inverse kinematics (IK).",
@@ -138,11 +351,44 @@ class SceneProperties(bpy.types.PropertyGroup):
         update=callback_streaming,
     )  # type: ignore (stops warning squiggles)
 
+    LatencyOffset: bpy.props.FloatProperty(
+        name="Latency Offset",
+        description="Seconds added to the measured round trip, when streaming looks ahead of the playhead (trajectory startup of Reachy).",
+        default=0.0,
+        min=-1.0,
+        max=2.0,
+        step=1,
+        update=callback_latency_offset,
+    )  # type: ignore (stops warning squiggles)
+
+    ControlProcess: bpy.props.BoolProperty(
+        description="If poses are sent to Reachy by a separate process, following them at a fixed rate independent of Blender.",
+        default=False,
+        update=callback_control_process,
+    )  # type: ignore (stops warning squiggles)
+
+    Mirroring: bpy.props.BoolProperty(
+        description="If addon is currently copying the pose of Reachy to the rig.",
+        default=False,
+        update=callback_mirroring,
+    )  # type: ignore (stops warning squiggles)
+
     Speaker: bpy.props.BoolProperty(
         description="If responses from ChatGPT are played through speaker.",
         default=False,
     )  # type: ignore (stops warning squiggles)
 
+    Synthesizer: bpy.props.EnumProperty(
+        name="Voice",
+        description="Text-to-speech used for responses.",
+        items=[
+            ("gtts", "Google (online)", "Google Translate text-to-speech"),
+            ("pyttsx3", "System (offline)", "Voices installed in the operating system"),
+        ],
+        default="gtts",
+        update=callback_synthesizer,
+    )  # type: ignore (stops warning squiggles)
+
     PromtType: bpy.props.EnumProperty(
         name="Promt Type",
         description="Choose if promt is provided as text or speech.",
@@ -160,6 +406,50 @@ class SceneProperties(bpy.types.PropertyGroup):
         update=callback_recording,
     )  # type: ignore (stops warning squiggles)
 
+    VoiceDetection: bpy.props.BoolProperty(
+        description="Start recording when speech is detected, and stop after trailing silence.",
+        default=True,
+    )  # type: ignore (stops warning squiggles)
+
+    TranscriptionEngine: bpy.props.EnumProperty(
+        name="Engine",
+        description="Speech-to-text backend running on CPU.",
+        items=[
+            ("whisper", "Whisper", "openai-whisper, PyTorch fp32"),
+            ("faster-whisper", "Faster Whisper", "CTranslate2, int8 quantized"),
+        ],
+        default="whisper",
+        update=callback_engine,
+    )  # type: ignore (stops warning squiggles)
+
+    TranscriptionThreads: bpy.props.IntProperty(
+        name="Threads",
+        description="CPU threads used for transcription (0 = backend default).",
+        default=0,
+        min=0,
+        max=64,
+        update=callback_engine,
+    )  # type: ignore (stops warning squiggles)
+
+    BeamSize: bpy.props.IntProperty(
+        name="Beam Size",
+        description="Beam search width, 1 is greedy decoding (0 = backend default).",
+        default=0,
+        min=0,
+        max=10,
+        update=callback_engine,
+    )  # type: ignore (stops warning squiggles)
+
+    StreamTranscription: bpy.props.BoolProperty(
+        description="Transcribe speech while recording, instead of after recording ends.",
+        default=True,
+    )  # type: ignore (stops warning squiggles)
+
+    PartialTranscription: bpy.props.BoolProperty(
+        description="Show the text while speaking. Costs extra decoding, slow without a GPU.",
+        default=False,
+    )  # type: ignore (stops warning squiggles)
+
 
 class REACHYMARIONETTE_OT_ConnectReachy(bpy.types.Operator):
     # Handling connection to Reachy
@@ -169,6 +459,9 @@ class REACHYMARIONETTE_OT_ConnectReachy(bpy.types.Operator):
     def execute(self, context):
         scene_properties = context.scene.scn_prop
 
+        if get_reachy(self.report) is None:
+            return {"CANCELLED"}
+
         reachy.connect_reachy(self.report, scene_properties.IPaddress)
 
         return {"FINISHED"}
@@ -181,6 +474,13 @@ class REACHYMARIONETTE_OT_DisconnectReachy(bpy.types.Operator):
 
     def execute(self, context):
 
+        if reachy is None:
+            self.report({"INFO"}, "No Reachy is connected")
+            return {"CANCELLED"}
+
+        # Control process is stopped on disconnect
+        context.scene.scn_prop.ControlProcess = False
+
         reachy.disconnect_reachy(self.report)
 
         return {"FINISHED"}
@@ -192,8 +492,12 @@ class REACHYMARIONETTE_OT_SendPose(bpy.types.Operator):
     bl_idname = "reachy_marionette.send_pose"
     bl_label = "Send current pose once"
 
+    @profiled("SendPose")
     def execute(self, context):
 
+        if get_reachy(self.report) is None:
+            return {"CANCELLED"}
+
         reachy.send_angles(self.report)
 
         return {"FINISHED"}
@@ -209,7 +513,8 @@ class REACHYMARIONETTE_OT_StreamPose(bpy.types.Operator):
         print("Stream starting...")
 
     def __del__(self):
-        reachy.set_state_idle()
+        if reachy is not None:
+            reachy.set_state_idle()
 
         print("Stream ended")
 
@@ -226,7 +531,12 @@ class REACHYMARIONETTE_OT_StreamPose(bpy.types.Operator):
 
         return {"PASS_THROUGH"}
 
+    @profiled("StreamPose")
     def invoke(self, context, event):
+
+        if get_reachy(self.report) is None:
+            return {"CANCELLED"}
+
         context.window_manager.modal_handler_add(self)
 
         reachy.stream_angles_enable(self.report)
@@ -234,6 +544,96 @@ class REACHYMARIONETTE_OT_StreamPose(bpy.types.Operator):
         return {"RUNNING_MODAL"}
 
 
+class REACHYMARIONETTE_OT_MirrorPose(bpy.types.Operator):
+    # Continously read joint positions of Reachy, and apply them to Blender rig
+
+    bl_idname = "reachy_marionette.mirror_angles"
+    bl_label = "Live mirroring of Reachy's pose"
+
+    def stop(self, context, message):
+
+        reachy.set_state_idle()
+        context.scene.scn_prop.Mirroring = False
+
+        self.report({"INFO"}, message)
+        return {"FINISHED"}
+
+    def modal(self, context, event):
+        scene_properties = context.scene.scn_prop
+
+        if not scene_properties.Mirroring:
+            return self.stop(context, "Stopping mirroring")
+
+        if event.type == "ESC":
+            return self.stop(context, "ESC key pressed, stopping mirroring")
+
+        return {"PASS_THROUGH"}
+
+    def invoke(self, context, event):
+        scene_properties = context.scene.scn_prop
+
+        if get_reachy(self.report) is None:
+            scene_properties.Mirroring = False
+            return {"CANCELLED"}
+
+        # Bone rotations are written directly, so IK must not override them
+        scene_properties.Kinematics = "FK"
+
+        if not reachy.mirror_angles_enable(self.report):
+            scene_properties.Mirroring = False
+            return {"CANCELLED"}
+
+        context.window_manager.modal_handler_add(self)
+
+        return {"RUNNING_MODAL"}
+
+
+class REACHYMARIONETTE_OT_TeachPose(bpy.types.Operator):
+    # Record arms of Reachy moved by hand, and store the motion as a new action
+
+    bl_idname = "reachy_marionette.teach_pose"
+    bl_label = "Record motion of Reachy into a new action"
+
+    def stop(self, context):
+        scene_properties = context.scene.scn_prop
+
+        reachy.teach_stop(self.report, tolerance=scene_properties.TeachTolerance)
+        scene_properties.Teaching = False
+
+        return {"FINISHED"}
+
+    def modal(self, context, event):
+        scene_properties = context.scene.scn_prop
+
+        recorder = reachy.teach_recorder
+
+        if not scene_properties.Teaching or recorder is None or not recorder.recording:
+            self.report({"INFO"}, "Stopping teach mode")
+            return self.stop(context)
+
+        if event.type == "ESC":
+            self.report({"INFO"}, "ESC key pressed, stopping teach mode")
+            return self.stop(context)
+
+        return {"PASS_THROUGH"}
+
+    def invoke(self, context, event):
+        scene_properties = context.scene.scn_prop
+
+        if context.object is None or context.object.type != "ARMATURE":
+            self.report({"ERROR"}, "Please select Armature")
+            scene_properties.Teaching = False
+            return {"CANCELLED"}
+
+        if get_reachy(self.report) is None or not reachy.teach_start(self.report):
+            scene_properties.Teaching = False
+            return {"CANCELLED"}
+
+        context.window_manager.modal_handler_add(self)
+
+        return {"RUNNING_MODAL"}
+
+
 class REACHYMARIONETTE_OT_AnimatePose(bpy.types.Operator):
     # Go through animation timeline and get angles from Blender rig, and send to Reachy
 
@@ -255,7 +655,12 @@ class REACHYMARIONETTE_OT_AnimatePose(bpy.types.Operator):
 
         return {"PASS_THROUGH"}
 
+    @profiled("AnimatePose")
     def invoke(self, context, event):
+
+        if get_reachy(self.report) is None:
+            return {"CANCELLED"}
+
         context.window_manager.modal_handler_add(self)
 
         reachy.animate_angles(self.report)
@@ -263,6 +668,29 @@ class REACHYMARIONETTE_OT_AnimatePose(bpy.types.Operator):
         return {"RUNNING_MODAL"}
 
 
+class REACHYMARIONETTE_OT_ExportTrajectories(bpy.types.Operator):
+    # Bake all actions, to be played without Blender by reachy_player.py
+
+    bl_idname = "reachy_marionette.export_trajectories"
+    bl_label = "Export actions as joint trajectories"
+
+    def execute(self, context):
+        scene_properties = context.scene.scn_prop
+
+        if get_reachy(self.report) is None:
+            return {"CANCELLED"}
+
+        if context.object is None or context.object.type != "ARMATURE":
+            self.report({"ERROR"}, "Please select Armature")
+            return {"CANCELLED"}
+
+        reachy.export_trajectories(
+            self.report, bpy.path.abspath(scene_properties.TrajectoryPath)
+        )
+
+        return {"FINISHED"}
+
+
 class REACHYMARIONETTE_OT_ActivateGPT(bpy.types.Operator):
 
     bl_idname = "reachy_marionette.activate_gpt"
@@ -271,6 +699,9 @@ class REACHYMARIONETTE_OT_ActivateGPT(bpy.types.Operator):
     def execute(self, context):
         scene_properties = context.scene.scn_prop
 
+        if get_gpt(self.report) is None:
+            return {"CANCELLED"}
+
         if not reachy_gpt.activate(self.report):
             return {"CANCELLED"}
 
@@ -283,13 +714,66 @@ class REACHYMARIONETTE_OT_SendRequest(bpy.types.Operator):
     bl_idname = "reachy_marionette.action_selection"
     bl_label = "Select action"
 
+    @profiled("SendRequest")
     def execute(self, context):
         scene_properties = context.scene.scn_prop
 
-        response = reachy_gpt.send_request(scene_properties.Promt, reachy, self.report)
+        if get_gpt(self.report) is None or get_orchestrator(self.report) is None:
+            return {"CANCELLED"}
 
-        if scene_properties.Speaker:
-            reachy_voice.speak_audio(response["answer"], language="da")
+        if scene_properties.Speaker and get_voice(self.report) is None:
+            return {"CANCELLED"}
+
+        response = reachy_gpt.send_request(scene_properties.Promt, self.report)
+
+        # Gesture and speech are played at the same time
+        orchestrator.play(
+            response, self.report, speak=scene_properties.Speaker, language="da"
+        )
+
+        return {"FINISHED"}
+
+
+class REACHYMARIONETTE_OT_CancelResponse(bpy.types.Operator):
+    # Stop gesture and speech of the current response
+
+    bl_idname = "reachy_marionette.cancel_response"
+    bl_label = "Stop current response"
+
+    def execute(self, context):
+
+        if orchestrator is not None:
+            orchestrator.cancel()
+
+        return {"FINISHED"}
+
+
+class REACHYMARIONETTE_OT_PresynthesizePhrases(bpy.types.Operator):
+    # Synthesize known phrases ahead of time, so they are played from the speech cache
+
+    bl_idname = "reachy_marionette.presynthesize_phrases"
+    bl_label = "Synthesize phrases from the '" + PHRASES_TEXT_NAME + "' text"
+
+    def execute(self, context):
+
+        text = bpy.data.texts.get(PHRASES_TEXT_NAME)
+
+        if text is None:
+            self.report(
+                {"ERROR"},
+                "No text named '"
+                + PHRASES_TEXT_NAME
+                + "', add one with a phrase per line.",
+            )
+            return {"CANCELLED"}
+
+        if get_voice(self.report) is None:
+            return {"CANCELLED"}
+
+        phrases = [line.body for line in text.lines if len(line.body.strip()) > 0]
+        reachy_voice.presynthesize(phrases, language="da")
+
+        self.report({"INFO"}, "Synthesizing " + str(len(phrases)) + " phrases...")
 
         return {"FINISHED"}
 
@@ -306,23 +790,37 @@ class REACHYMARIONETTE_OT_RecordAudio(bpy.types.Operator):
     def __del__(self):
         print("Recording processed")
 
+    @profiled("RecordAudio.process")
     def process_recording(self, scene_properties):
 
         reachy_voice.stop_recording()
         print("Recording ended")
 
-        audio_file_path = bpy.path.abspath(AUDIO_FILE_PATH)
-
         # Convert to text
-        transcription = reachy_voice.transcribe_audio(
-            audio_file_path, self.report, language="da"
-        )
+        if reachy_voice.transcriber is not None:
+            transcription = reachy_voice.finish_transcription(self.report)
+        else:
+            transcription = reachy_voice.transcribe_recording(
+                self.report, language="da"
+            )
+
+        # Nothing was said, e.g. voice detection heard no speech
+        if len(transcription) == 0:
+            return
 
         # Send promt to ChatGPT
-        response = reachy_gpt.send_request(transcription, reachy, self.report)
+        response = reachy_gpt.send_request(transcription, self.report)
 
-        if scene_properties.Speaker:
-            reachy_voice.speak_audio(response["answer"], language="da")
+        # Gesture and speech are played at the same time
+        orchestrator.play(
+            response, self.report, speak=scene_properties.Speaker, language="da"
+        )
+
+    def finish(self, context):
+
+        context.window_manager.event_timer_remove(self.timer)
+
+        return {"FINISHED"}
 
     def modal(self, context, event):
         scene_properties = context.scene.scn_prop
@@ -331,32 +829,125 @@ class REACHYMARIONETTE_OT_RecordAudio(bpy.types.Operator):
         if not reachy_voice.recording:
             scene_properties.Recording = False
             self.process_recording(scene_properties)
-            return {"FINISHED"}
+            return self.finish(context)
 
         if not scene_properties.Recording:
             self.report({"INFO"}, "Stopping recording")
             self.process_recording(scene_properties)
-            return {"FINISHED"}
+            return self.finish(context)
 
         if event.type == "ESC":
-            self.report({"INFO"}, "ESC key pressed, stopping recording and processing")
-            return {"FINISHED"}
+            self.report({"INFO"}, "ESC key pressed, cancelling recording")
+            reachy_voice.cancel_recording()
+            scene_properties.Recording = False
+            return self.finish(context)
+
+        # Redraw panel with the partial transcription, when it changed
+        if reachy_voice.partial_transcription != self.partial_transcription:
+            self.partial_transcription = reachy_voice.partial_transcription
+
+            for window in context.window_manager.windows:
+                for area in window.screen.areas:
+                    if area.type == "VIEW_3D":
+                        area.tag_redraw()
 
         return {"PASS_THROUGH"}
 
+    @profiled("RecordAudio")
     def invoke(self, context, event):
+        scene_properties = context.scene.scn_prop
+
+        if (
+            get_voice(self.report) is None
+            or get_gpt(self.report) is None
+            or get_orchestrator(self.report) is None
+        ):
+            scene_properties.Recording = False
+            return {"CANCELLED"}
+
         context.window_manager.modal_handler_add(self)
 
+        # Timer events let modal notice when voice activity detection ends the recording,
+        # also without any user input
+        self.timer = context.window_manager.event_timer_add(0.1, window=context.window)
+
         audio_file_path = bpy.path.abspath(AUDIO_FILE_PATH)
 
+        reachy_voice.use_vad = scene_properties.VoiceDetection
+        reachy_voice.use_streaming = scene_properties.StreamTranscription
+        reachy_voice.use_partials = scene_properties.PartialTranscription
+
+        self.partial_transcription = ""
+
         # Record audio sample
         reachy_voice.start_recording(
-            self.report, file_path=audio_file_path, duration_max=10.0
+            self.report, file_path=audio_file_path, duration_max=10.0, language="da"
         )
 
         return {"RUNNING_MODAL"}
 
 
+class REACHYMARIONETTE_OT_InstallDependencies(bpy.types.Operator):
+    # Install missing packages in the background
+
+    bl_idname = "reachy_marionette.install_dependencies"
+    bl_label = "Install missing Python packages with pip"
+
+    def execute(self, context):
+
+        # Features listed in the panel, including a selected engine that is not installed
+        installer.start(list(missing))
+
+        if installer.installing:
+            bpy.app.timers.register(self.update_progress)
+
+        return {"FINISHED"}
+
+    @staticmethod
+    def update_progress():
+        # Redraw panels with installation progress, until done
+
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == "VIEW_3D":
+                    area.tag_redraw()
+
+        if installer.installing:
+            return 0.5
+
+        update_missing_packages()
+        return None
+
+
+class REACHYMARIONETTE_PT_PanelDependencies(bpy.types.Panel):
+    # Addon panel displaying missing packages, only shown when there are some
+
+    bl_label = "Dependencies"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "ReachyMarionette"
+
+    @classmethod
+    def poll(cls, context):
+        return installer.installing or len(missing) > 0 or installer.status != ""
+
+    def draw(self, context):
+        layout = self.layout
+
+        for feature, packages in missing.items():
+            layout.label(text=feature.capitalize() + ": " + ", ".join(packages))
+
+        if installer.status != "":
+            layout.label(text=installer.status)
+
+        if not installer.installing and len(missing) > 0:
+            layout.row().operator(
+                REACHYMARIONETTE_OT_InstallDependencies.bl_idname,
+                text="Install Packages",
+                icon="IMPORT",
+            )
+
+
 class REACHYMARIONETTE_PT_PanelConnection(bpy.types.Panel):
     # Addon panel displaying options
 
@@ -372,7 +963,7 @@ class REACHYMARIONETTE_PT_PanelConnection(bpy.types.Panel):
 
         layout.prop(scene_properties, "IPaddress")
 
-        if reachy.reachy == None:
+        if reachy is None or reachy.reachy == None:
             layout.row().operator(
                 REACHYMARIONETTE_OT_ConnectReachy.bl_idname,
                 text="Connect to Reachy",
@@ -386,6 +977,10 @@ class REACHYMARIONETTE_PT_PanelConnection(bpy.types.Panel):
                 icon="UNLINKED",
             )
 
+        label = "Profiling..." if scene_properties.Profiling else "Profile Addon"
+        icon = "REC" if scene_properties.Profiling else "TIME"
+        layout.prop(scene_properties, "Profiling", text=label, icon=icon, toggle=True)
+
 
 class REACHYMARIONETTE_PT_PanelManual(bpy.types.Panel):
     # Addon panel displaying options
@@ -412,12 +1007,36 @@ class REACHYMARIONETTE_PT_PanelManual(bpy.types.Panel):
         icon = "RADIOBUT_ON" if scene_properties.Streaming else "RADIOBUT_OFF"
         layout.prop(scene_properties, "Streaming", text=label, icon=icon, toggle=True)
 
+        row = layout.row()
+        row.prop(scene_properties, "LatencyOffset", text="Offset")
+        if reachy is not None and reachy.latency > 0.0:
+            row.label(text="Round trip: %d ms" % (reachy.latency * 1000))
+
+        layout.prop(scene_properties, "ControlProcess", text="Control Process")
+
+        label = "Mirroring..." if scene_properties.Mirroring else "Mirror Robot Pose"
+        icon = "RADIOBUT_ON" if scene_properties.Mirroring else "RADIOBUT_OFF"
+        layout.prop(scene_properties, "Mirroring", text=label, icon=icon, toggle=True)
+
         layout.row().operator(
             REACHYMARIONETTE_OT_AnimatePose.bl_idname,
             text="Animate Pose",
             icon="PLAY",
         )
 
+        label = "Teaching..." if scene_properties.Teaching else "Teach Motion"
+        icon = "REC" if scene_properties.Teaching else "RADIOBUT_OFF"
+        row = layout.row()
+        row.prop(scene_properties, "Teaching", text=label, icon=icon, toggle=True)
+        row.prop(scene_properties, "TeachTolerance")
+
+        layout.prop(scene_properties, "TrajectoryPath")
+        layout.row().operator(
+            REACHYMARIONETTE_OT_ExportTrajectories.bl_idname,
+            text="Export Actions",
+            icon="EXPORT",
+        )
+
 
 class REACHYMARIONETTE_PT_PanelAI(bpy.types.Panel):
     # Addon panel displaying options
@@ -432,7 +1051,7 @@ class REACHYMARIONETTE_PT_PanelAI(bpy.types.Panel):
         layout = self.layout
         scene_properties = context.scene.scn_prop
 
-        if reachy_gpt.client == None:
+        if reachy_gpt is None or reachy_gpt.client == None:
 
             layout.row().operator(
                 REACHYMARIONETTE_OT_ActivateGPT.bl_idname,
@@ -451,6 +1070,15 @@ class REACHYMARIONETTE_PT_PanelAI(bpy.types.Panel):
         icon = "MUTE_IPO_ON" if scene_properties.Speaker else "MUTE_IPO_OFF"
         layout.prop(scene_properties, "Speaker", text=label, icon=icon, toggle=True)
 
+        if scene_properties.Speaker:
+            layout.prop(scene_properties, "Synthesizer")
+
+            layout.row().operator(
+                REACHYMARIONETTE_OT_PresynthesizePhrases.bl_idname,
+                text="Pre-synthesize Phrases",
+                icon="FILE_SOUND",
+            )
+
         layout.prop(scene_properties, "PromtType", expand=True)
 
         if scene_properties.PromtType == "Text":
@@ -465,6 +1093,32 @@ class REACHYMARIONETTE_PT_PanelAI(bpy.types.Panel):
 
         elif scene_properties.PromtType == "Speech":
 
+            label = (
+                "Voice Detection ON"
+                if scene_properties.VoiceDetection
+                else "Voice Detection OFF"
+            )
+            layout.prop(scene_properties, "VoiceDetection", text=label, toggle=True)
+
+            label = (
+                "Live Transcription ON"
+                if scene_properties.StreamTranscription
+                else "Live Transcription OFF"
+            )
+            layout.prop(
+                scene_properties, "StreamTranscription", text=label, toggle=True
+            )
+
+            if scene_properties.StreamTranscription:
+                layout.prop(
+                    scene_properties, "PartialTranscription", text="Show Partial Text"
+                )
+
+            layout.prop(scene_properties, "TranscriptionEngine")
+            row = layout.row()
+            row.prop(scene_properties, "TranscriptionThreads")
+            row.prop(scene_properties, "BeamSize")
+
             # layout.row().operator(
             #     REACHYMARIONETTE_OT_RecordAudio.bl_idname,
             #     text="Record Audio",
@@ -477,17 +1131,38 @@ class REACHYMARIONETTE_PT_PanelAI(bpy.types.Panel):
                 scene_properties, "Recording", text=label, icon=icon, toggle=True
             )
 
+            if (
+                scene_properties.Recording
+                and reachy_voice is not None
+                and reachy_voice.partial_transcription
+            ):
+                layout.label(text=reachy_voice.partial_transcription)
+
+        if orchestrator is not None and orchestrator.active:
+            layout.row().operator(
+                REACHYMARIONETTE_OT_CancelResponse.bl_idname,
+                text="Stop Response",
+                icon="CANCEL",
+            )
+
 
 classes = (
     SceneProperties,
+    REACHYMARIONETTE_OT_InstallDependencies,
     REACHYMARIONETTE_OT_ConnectReachy,
     REACHYMARIONETTE_OT_DisconnectReachy,
     REACHYMARIONETTE_OT_SendPose,
     REACHYMARIONETTE_OT_StreamPose,
+    REACHYMARIONETTE_OT_MirrorPose,
+    REACHYMARIONETTE_OT_TeachPose,
     REACHYMARIONETTE_OT_AnimatePose,
+    REACHYMARIONETTE_OT_ExportTrajectories,
     REACHYMARIONETTE_OT_ActivateGPT,
     REACHYMARIONETTE_OT_SendRequest,
+    REACHYMARIONETTE_OT_CancelResponse,
+    REACHYMARIONETTE_OT_PresynthesizePhrases,
     REACHYMARIONETTE_OT_RecordAudio,
+    REACHYMARIONETTE_PT_PanelDependencies,
     REACHYMARIONETTE_PT_PanelConnection,
     REACHYMARIONETTE_PT_PanelManual,
     REACHYMARIONETTE_PT_PanelAI,
@@ -500,6 +1175,13 @@ def register():
 
     bpy.types.Scene.scn_prop = bpy.props.PointerProperty(type=SceneProperties)
 
+    update_missing_packages()
+
+    print(
+        "ReachyMarionette: enabled in %.3f s"
+        % (time.perf_counter() - import_start_time)
+    )
+
 
 def unregister():
     for cls in classes:
@@ -507,9 +1189,8 @@ def unregister():
 
     del bpy.types.Scene.scn_prop
 
-    def temp(_x, _y): ...
-
-    reachy.disconnect_reachy(temp)
+    if reachy is not None:
+        reachy.disconnect_reachy(print_report)
 
 
 if __name__ == "__main__":
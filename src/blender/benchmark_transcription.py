@@ -0,0 +1,148 @@
+# Benchmark of transcription engines on a folder of fixture clips.
+#
+# Every clip is a .wav file with a reference transcript in a .txt file of the same name.
+# Reports real-time factor (decode time / audio duration) and word error rate per
+# engine configuration, so the best latency / accuracy point can be chosen per machine.
+#
+# Run outside Blender, from this folder:
+#   python benchmark_transcription.py path/to/clips --engines whisper faster-whisper --threads 4 8
+
+import argparse
+import itertools
+import os
+import time
+
+from reachy_audio import load_wav
+from reachy_transcription import ENGINES, create_engine, normalize_word
+
+SAMPLERATE = 16000
+
+
+def load_fixtures(directory):
+
+    fixtures = []
+
+    for file_name in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(file_name)
+
+        if extension.lower() != ".wav":
+            continue
+
+        transcript_path = os.path.join(directory, name + ".txt")
+        if not os.path.exists(transcript_path):
+            print("Skipping '" + file_name + "', no reference transcript")
+            continue
+
+        with open(transcript_path, encoding="utf-8") as file:
+            reference = file.read()
+
+        fixtures.append(
+            (
+                name,
+                load_wav(os.path.join(directory, file_name), SAMPLERATE)[0],
+                reference,
+            )
+        )
+
+    return fixtures
+
+
+def word_errors(reference: str, hypothesis: str):
+    # Word level Levenshtein distance, and number of reference words
+
+    ref = [word for word in map(normalize_word, reference.split()) if word]
+    hyp = [word for word in map(normalize_word, hypothesis.split()) if word]
+
+    distances = list(range(len(hyp) + 1))
+
+    for i, ref_word in enumerate(ref, start=1):
+        previous, distances[0] = distances[0], i
+
+        for j, hyp_word in enumerate(hyp, start=1):
+            substitution = previous + (ref_word != hyp_word)
+            previous = distances[j]
+            distances[j] = min(distances[j] + 1, distances[j - 1] + 1, substitution)
+
+    return distances[-1], len(ref)
+
+
+def benchmark(engine, fixtures, language):
+
+    # Warm up, so one-time initialization is not counted
+    engine.transcribe(fixtures[0][1], language=language)
+
+    decode_time = 0.0
+    audio_time = 0.0
+    errors = 0
+    words = 0
+
+    for name, audio, reference in fixtures:
+        start = time.perf_counter()
+        hypothesis = engine.transcribe(audio, language=language)
+        elapsed = time.perf_counter() - start
+
+        clip_errors, clip_words = word_errors(reference, hypothesis)
+
+        decode_time += elapsed
+        audio_time += len(audio) / SAMPLERATE
+        errors += clip_errors
+        words += clip_words
+
+        print("  %-24s %6.2fs  %s" % (name, elapsed, hypothesis.strip()))
+
+    return decode_time / audio_time, errors / max(words, 1)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark transcription engines on fixture clips."
+    )
+    parser.add_argument("clips", help="Folder of .wav clips with .txt transcripts")
+    parser.add_argument("--language", default="da")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES))
+    parser.add_argument("--models", nargs="+", default=["small"])
+    parser.add_argument("--threads", nargs="+", type=int, default=[0])
+    parser.add_argument("--beam-sizes", nargs="+", type=int, default=[1, 5])
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.clips)
+
+    if not fixtures:
+        parser.error("No clips with reference transcripts in '" + args.clips + "'")
+
+    results = []
+
+    configs = itertools.product(
+        args.engines, args.models, args.threads, args.beam_sizes
+    )
+
+    for engine_name, model_name, threads, beam_size in configs:
+        label = "%s/%s threads=%d beam=%d" % (
+            engine_name,
+            model_name,
+            threads,
+            beam_size,
+        )
+        print(label)
+
+        try:
+            start = time.perf_counter()
+            engine = create_engine(engine_name, model_name, threads or None, beam_size)
+            load_time = time.perf_counter() - start
+        except ImportError as error:
+            print("  skipped: " + str(error))
+            continue
+
+        rtf, wer = benchmark(engine, fixtures, args.language)
+        results.append((label, load_time, rtf, wer))
+
+    print()
+    print("%-44s %8s %8s %8s" % ("configuration", "load", "RTF", "WER"))
+
+    for label, load_time, rtf, wer in sorted(results, key=lambda result: result[2]):
+        print("%-44s %7.1fs %8.3f %7.1f%%" % (label, load_time, rtf, wer * 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# Batch evaluation of action selection on a file of prompts, e.g. real visitor utterances.
+#
+# Every prompt goes through the same message building and response validation as
+# ReachyGPT.send_request, without chat history and without Blender. Prompts are sent
+# concurrently by a bounded pool of workers, limited to a number of requests per second.
+# Hedged second requests are off by default, as they would bypass the rate limit.
+# Reports action distribution, failure rate and latency percentiles, so changes to the
+# system prompt or the action catalogue can be compared quickly.
+#
+# Run outside Blender, from this folder, with OPENAI_API_KEY set:
+#   python evaluate_gpt.py prompts.txt --workers 8 --rate 5
+#   python evaluate_gpt.py prompts.txt --system-prompt new_prompt.txt --output results.jsonl
+
+import argparse
+import collections
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from reachy_gpt import ReachyGPT
+
+
+class RateLimiter:
+    # Token bucket, shared by the workers: rate requests per second, with bursts of up to burst
+
+    def __init__(self, rate, burst=1):
+
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+
+                wait = (1.0 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def load_prompts(file_path):
+    # One prompt per line, empty lines and lines starting with # are skipped
+
+    with open(file_path, encoding="utf-8") as file:
+        lines = [line.strip() for line in file]
+
+    return [line for line in lines if len(line) > 0 and not line.startswith("#")]
+
+
+def evaluate_prompt(reachy_gpt, rate_limiter, promt):
+
+    errors = []
+
+    def report(report_type, message):
+        if "ERROR" in report_type:
+            errors.append(message)
+
+    rate_limiter.acquire()
+
+    start_time = time.perf_counter()
+    response = reachy_gpt.get_gpt_response(reachy_gpt.build_messages(promt, []), report)
+    latency = time.perf_counter() - start_time
+
+    result = {
+        "promt": promt,
+        "latency": latency,
+        "action": None,
+        "answer": None,
+        "valid_action": False,
+        "recovered": len(errors) > 0 and not response.get("fallback", False),
+    }
+
+    # Fallback responses are used when the requests failed or the deadline passed
+    if not response.get("fallback", False):
+        result["valid_action"] = response["action"] in reachy_gpt.action_catalouge
+        result["answer"] = response["answer"]
+        result["action"] = reachy_gpt.validate_action(response, report)["action"]
+
+    result["errors"] = errors
+
+    return result
+
+
+def percentile(values, fraction):
+    # Nearest rank percentile of sorted values
+
+    index = min(int(fraction * len(values)), len(values) - 1)
+
+    return values[index]
+
+
+def print_summary(results, duration, action_catalouge):
+
+    count = len(results)
+    parsed = [result for result in results if result["action"] is not None]
+    invalid = [result for result in parsed if not result["valid_action"]]
+
+    print()
+    print("%d prompts in %.1f s (%.1f prompts/s)" % (count, duration, count / duration))
+    print(
+        "Failed responses: %d (%.1f %%)"
+        % (count - len(parsed), (count - len(parsed)) / count * 100)
+    )
+
+    recovered = [result for result in parsed if result["recovered"]]
+    if len(recovered) > 0:
+        print("Errors recovered by second request: %d" % len(recovered))
+
+    # Group failures by the reported error, without its details
+    reasons = collections.Counter(
+        result["errors"][0].split(":")[0] if result["errors"] else "Unknown"
+        for result in results
+        if result["action"] is None
+    )
+    for reason, reason_count in reasons.most_common():
+        print("  %-40s %d" % (reason, reason_count))
+
+    print(
+        "Actions not in catalogue: %d (%.1f %%)"
+        % (len(invalid), len(invalid) / count * 100)
+    )
+
+    # Off-catalogue actions are counted as ReachyShrug, as in send_request
+    print()
+    print("Action distribution:")
+    actions = collections.Counter(result["action"] for result in parsed)
+    for action in action_catalouge:
+        print(
+            "  %-20s %5d (%.1f %%)"
+            % (action, actions[action], actions[action] / count * 100)
+        )
+
+    latencies = sorted(result["latency"] for result in results)
+    print()
+    print(
+        "Latency: p50 %.2f s, p90 %.2f s, p95 %.2f s, p99 %.2f s, max %.2f s"
+        % (
+            percentile(latencies, 0.5),
+            percentile(latencies, 0.9),
+            percentile(latencies, 0.95),
+            percentile(latencies, 0.99),
+            latencies[-1],
+        )
+    )
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Evaluate action selection of ChatGPT on a file of prompts."
+    )
+    parser.add_argument("prompts", help="Text file with one prompt per line")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests")
+    parser.add_argument(
+        "--rate", type=float, default=5.0, help="Largest number of requests per second"
+    )
+    parser.add_argument("--model", help="ChatGPT model (default from ReachyGPT)")
+    parser.add_argument("--system-prompt", help="Text file replacing the system prompt")
+    parser.add_argument(
+        "--actions", nargs="+", help="Action catalogue replacing the default"
+    )
+    parser.add_argument(
+        "--hedging",
+        action="store_true",
+        help="Send second requests like the addon, not counted by --rate",
+    )
+    parser.add_argument("--output", help="JSON lines file with the result per prompt")
+    args = parser.parse_args()
+
+    prompts = load_prompts(args.prompts)
+    if len(prompts) == 0:
+        parser.error("No prompts in '" + args.prompts + "'")
+
+    reachy_gpt = ReachyGPT()
+
+    if args.model:
+        reachy_gpt.gpt_model = args.model
+
+    if args.system_prompt:
+        with open(args.system_prompt, encoding="utf-8") as file:
+            reachy_gpt.system_prompt = file.read()
+
+    if args.actions:
+        reachy_gpt.action_catalouge = args.actions
+
+    # Without hedging every request takes a token of the rate limiter, and latencies are
+    # those of single requests
+    reachy_gpt.hedging = args.hedging
+
+    if not reachy_gpt.activate(lambda report_type, message: print(message)):
+        return
+
+    rate_limiter = RateLimiter(args.rate, burst=args.workers)
+
+    print(
+        "Evaluating %d prompts with %s, %d workers, %.1f requests/s..."
+        % (len(prompts), reachy_gpt.gpt_model, args.workers, args.rate)
+    )
+
+    start_time = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = list(
+            executor.map(
+                lambda promt: evaluate_prompt(reachy_gpt, rate_limiter, promt),
+                prompts,
+            )
+        )
+
+    duration = time.perf_counter() - start_time
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            for result in results:
+                file.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    print_summary(results, duration, reachy_gpt.action_catalouge)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+from math import gcd
+import threading
+
+import miniaudio
+import numpy as np
+import scipy.io.wavfile as wav
+from scipy.signal import resample_poly
+import sounddevice as sd
+
+# Audio is handled as float32 in [-1, 1] throughout, and decoded in-process (no FFmpeg)
+
+
+def to_float32(samples: np.ndarray):
+    # Integer PCM to float32, scaled in a single pass without a float64 copy
+
+    if samples.dtype == np.float32:
+        return samples
+
+    if np.issubdtype(samples.dtype, np.integer):
+        info = np.iinfo(samples.dtype)
+        half_range = (int(info.max) - int(info.min) + 1) // 2
+        center = int(info.min) + half_range  # Non-zero for unsigned 8 bit PCM
+
+        if center != 0:
+            samples = samples.astype(np.float32) - np.float32(center)
+
+        return np.multiply(samples, np.float32(1.0 / half_range), dtype=np.float32)
+
+    return samples.astype(np.float32)
+
+
+def to_mono(samples: np.ndarray):
+
+    if samples.ndim == 1:
+        return samples
+
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def decode_mp3(data: bytes, samplerate=None):
+    # Decode MP3 bytes to mono float32 samples
+
+    decoded = miniaudio.decode(
+        data,
+        output_format=miniaudio.SampleFormat.FLOAT32,
+        nchannels=1,
+        sample_rate=samplerate or 0,  # 0 keeps the source rate
+    )
+
+    # View of the decoded buffer, no copy
+    samples = np.frombuffer(decoded.samples, dtype=np.float32)
+
+    return samples, decoded.sample_rate
+
+
+def load_wav(file_path: str, samplerate=None):
+    # Mono float32 samples of a WAV file, optionally resampled
+
+    samplerate_file, samples = wav.read(file_path)
+    samples = to_mono(to_float32(samples))
+
+    if samplerate is None:
+        return samples, samplerate_file
+
+    return resample(samples, samplerate_file, samplerate), samplerate
+
+
+def save_wav(file_path: str, samples: np.ndarray, samplerate):
+    wav.write(file_path, samplerate, samples.astype(np.float32, copy=False))
+
+
+def resample(samples: np.ndarray, samplerate_in, samplerate_out):
+    # Polyphase resampling along the first axis, keeping float32
+
+    if samplerate_in == samplerate_out:
+        return samples
+
+    divisor = gcd(int(samplerate_in), int(samplerate_out))
+    resampled = resample_poly(
+        samples, samplerate_out // divisor, samplerate_in // divisor, axis=0
+    )
+
+    return resampled.astype(np.float32, copy=False)
+
+
+class RingBuffer:
+    # Preallocated circular buffer of float32 frames, reused between recordings.
+    # Frames are addressed by their absolute index since the last clear().
+
+    def __init__(self, capacity: int, channels=1):
+
+        self.channels = channels
+        self.lock = threading.Lock()
+
+        self.capacity = 0
+        self.data = None
+        self.resize(capacity)
+
+    def resize(self, capacity: int):
+
+        with self.lock:
+            if capacity != self.capacity:
+                self.capacity = capacity
+                self.data = np.zeros((capacity, self.channels), dtype=np.float32)
+
+            self.write_pos = 0
+            self.frames_written = 0
+
+    def clear(self):
+
+        with self.lock:
+            self.write_pos = 0
+            self.frames_written = 0
+
+    def __len__(self):
+        return min(self.frames_written, self.capacity)
+
+    def write(self, frames: np.ndarray):
+
+        frames = frames.reshape(-1, self.channels)
+        count = len(frames)
+
+        with self.lock:
+            # Only the newest 'capacity' frames can be kept
+            if count > self.capacity:
+                frames = frames[-self.capacity :]
+                self.write_pos = (
+                    self.write_pos + count - self.capacity
+                ) % self.capacity
+                self.frames_written += count - self.capacity
+                count = self.capacity
+
+            end = self.write_pos + count
+
+            if end <= self.capacity:
+                self.data[self.write_pos : end] = frames
+            else:
+                split = self.capacity - self.write_pos
+                self.data[self.write_pos :] = frames[:split]
+                self.data[: count - split] = frames[split:]
+
+            self.write_pos = end % self.capacity
+            self.frames_written += count
+
+    def read(self, start=None, stop=None):
+        # Copy frames [start, stop) out in chronological order, clamped to what is still buffered
+
+        with self.lock:
+            oldest = max(0, self.frames_written - self.capacity)
+
+            start = oldest if start is None else max(start, oldest)
+            stop = (
+                self.frames_written if stop is None else min(stop, self.frames_written)
+            )
+
+            if stop <= start:
+                return np.zeros((0, self.channels), dtype=np.float32)
+
+            begin = start % self.capacity
+            end = begin + (stop - start)
+
+            if end <= self.capacity:
+                return self.data[begin:end].copy()
+
+            return np.concatenate(
+                (self.data[begin:], self.data[: end - self.capacity]), axis=0
+            )
+
+
+class VoiceActivityDetector:
+    # Energy / zero-crossing voice activity detection on fixed length frames.
+    # Works both offline on a whole clip (trim) and online on streamed blocks (update).
+
+    def __init__(
+        self,
+        samplerate,
+        frame_duration=0.02,
+        energy_threshold=-40.0,
+        zcr_threshold=0.3,
+        speech_min=0.1,
+        hangover=0.8,
+        padding=0.2,
+    ):
+
+        self.samplerate = samplerate
+        self.frame_len = max(int(frame_duration * samplerate), 1)
+
+        self.energy_threshold = energy_threshold  # dBFS a voiced frame must exceed
+        # Zero-crossing rate of unvoiced speech (s, f, ...)
+        self.zcr_threshold = zcr_threshold
+
+        # Durations are converted to frame counts
+        self.speech_min = self.frames_from_seconds(speech_min)
+        self.hangover = self.frames_from_seconds(hangover)
+        self.padding = self.frames_from_seconds(padding)
+
+        self.reset()
+
+    def frames_from_seconds(self, seconds):
+        return max(int(round(seconds * self.samplerate / self.frame_len)), 1)
+
+    def reset(self):
+
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.frame_count = 0
+        self.speech_run = 0
+        self.silence_run = 0
+
+        self.triggered = False
+        self.speech_start = None  # Sample index of detected speech start
+
+    def frame_speech(self, samples: np.ndarray):
+        # Classify every complete frame of samples as speech (True) or silence (False)
+
+        count = len(samples) // self.frame_len
+        frames = samples[: count * self.frame_len].reshape(count, self.frame_len)
+
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        energy = 20.0 * np.log10(rms + 1e-10)
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame_len
+
+        voiced = energy > self.energy_threshold
+        unvoiced = (energy > self.energy_threshold - 10.0) & (zcr > self.zcr_threshold)
+
+        return voiced | unvoiced
+
+    def speech_bounds(self, samples: np.ndarray):
+        # Sample range [start, stop) containing speech, or None if there is no speech
+
+        speech = self.frame_speech(samples)
+
+        if len(speech) < self.speech_min:
+            return None
+
+        # Require speech_min consecutive speech frames, so clicks are not taken as speech
+        runs = np.convolve(speech, np.ones(self.speech_min, dtype=int), mode="valid")
+        onsets = np.flatnonzero(runs == self.speech_min)
+
+        if len(onsets) == 0:
+            return None
+
+        start = max(onsets[0] - self.padding, 0)
+        stop = min(np.flatnonzero(speech)[-1] + 1 + self.padding, len(speech))
+
+        return start * self.frame_len, min(stop * self.frame_len, len(samples))
+
+    def trim(self, samples: np.ndarray):
+        # Remove leading and trailing silence
+
+        bounds = self.speech_bounds(samples.reshape(-1))
+
+        if bounds is None:
+            return samples[:0]
+
+        return samples[bounds[0] : bounds[1]]
+
+    def update(self, samples: np.ndarray):
+        # Feed a block of streamed samples. Returns "start" when speech begins,
+        # "end" when the trailing silence exceeds the hangover, otherwise None.
+
+        samples = np.concatenate((self.remainder, samples.reshape(-1)))
+        count = len(samples) // self.frame_len
+        self.remainder = samples[count * self.frame_len :]
+
+        event = None
+
+        for index, is_speech in enumerate(self.frame_speech(samples)):
+
+            if is_speech:
+                self.speech_run += 1
+                self.silence_run = 0
+            else:
+                self.speech_run = 0
+                self.silence_run += 1
+
+            if not self.triggered and self.speech_run >= self.speech_min:
+                self.triggered = True
+                onset = self.frame_count + index + 1 - self.speech_min - self.padding
+                self.speech_start = max(onset, 0) * self.frame_len
+                event = "start"
+
+            elif self.triggered and self.silence_run >= self.hangover:
+                event = "end"
+                break
+
+        self.frame_count += count
+
+        return event
+
+
+class AudioCapture:
+    # Microphone capture driven by the PortAudio callback thread. Samples are written
+    # straight into a RingBuffer, and the end of a recording is signalled with an event.
+    # With voice activity detection, the recording starts on speech and stops on silence.
+
+    def __init__(self, samplerate=44100, channels=1, duration_max=10.0):
+
+        self.samplerate = samplerate
+        self.channels = channels
+
+        self.buffer = RingBuffer(int(duration_max * samplerate), channels)
+        self.stream = None
+        self.frames_max = None
+
+        self.vad = VoiceActivityDetector(samplerate)
+        self.use_vad = False
+        self.start_frame = 0  # Absolute frame where the recording begins
+
+        self.stopped = threading.Event()
+        self.stopped.set()
+
+    @property
+    def active(self):
+        return not self.stopped.is_set()
+
+    def callback(self, indata, frames, time_info, status):
+
+        if status:
+            print("Audio capture: " + str(status))
+
+        listening = self.use_vad and not self.vad.triggered
+
+        # duration_max counts from the start of speech, not from when listening started
+        if self.frames_max is not None and not listening:
+            remaining = self.start_frame + self.frames_max - self.buffer.frames_written
+            indata = indata[: max(remaining, 0)]
+
+        self.buffer.write(indata)
+
+        if self.use_vad:
+            event = self.vad.update(indata[:, 0])
+
+            if event == "start":
+                self.start_frame = self.vad.speech_start
+                print("Speech detected")
+
+            elif event == "end":
+                print("Silence detected, stopping recording")
+                self.stopped.set()
+                raise sd.CallbackStop
+
+        if listening or self.frames_max is None:
+            return
+
+        if self.buffer.frames_written >= self.start_frame + self.frames_max:
+            self.stopped.set()
+            raise sd.CallbackStop
+
+    def start(self, duration_max=None, use_vad=False):
+
+        if self.active:
+            return
+
+        self.frames_max = None
+        if duration_max is not None:
+            self.frames_max = int(duration_max * self.samplerate)
+
+            # Room for the audio preceding the detected speech onset
+            capacity = self.frames_max + self.vad.frame_len * (
+                self.vad.speech_min + self.vad.padding
+            )
+
+            # Only grow the buffer, so repeated recordings reuse the same memory
+            if capacity > self.buffer.capacity:
+                self.buffer.resize(capacity)
+
+        self.use_vad = use_vad
+        self.vad.reset()
+        self.start_frame = 0
+
+        self.buffer.clear()
+        self.stopped.clear()
+
+        self.stream = sd.InputStream(
+            samplerate=self.samplerate,
+            channels=self.channels,
+            dtype="float32",
+            callback=self.callback,
+        )
+        self.stream.start()
+
+    def wait(self, timeout=None):
+        # Block without spinning until the recording has been stopped
+        return self.stopped.wait(timeout)
+
+    def request_stop(self):
+        self.stopped.set()
+
+    def stop(self):
+
+        self.stopped.set()
+
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def read(self, start=None, stop=None, samplerate=None):
+        # Mono audio of absolute frames [start, stop), optionally resampled
+
+        audio = self.buffer.read(start, stop).mean(axis=1, dtype=np.float32)
+
+        if samplerate is not None:
+            audio = resample(audio, self.samplerate, samplerate)
+
+        return audio
+
+    def get_audio(self, trim=False):
+
+        if self.use_vad and not self.vad.triggered:
+            # No speech was detected
+            return self.buffer.read(0, 0)
+
+        audio = self.buffer.read(self.start_frame)
+
+        if trim:
+            audio = self.vad.trim(audio)
+
+        return audio
@@ -0,0 +1,124 @@
+# Shared memory bridge between Blender and the robot control process (reachy_control.py).
+#
+# Blender publishes joint targets into a float array, and the control process reads them
+# at its own fixed rate. A sequence counter makes the exchange lock-free (a seqlock): it is
+# odd while the writer updates the array, so readers retry instead of using a torn update.
+#
+# Layout of the array: sequence, closed flag, heartbeat (monotonic seconds), movement
+# duration (seconds), joint angles (degrees, in the order of JOINT_NAMES).
+#
+# The writer updates the heartbeat from a thread, so the reader notices when Blender is
+# gone without closing the bridge (e.g. a crash). Checking the parent process is not
+# enough, as Windows does not give orphaned processes a new parent.
+
+import os
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+SEQUENCE = 0
+CLOSED = 1
+HEARTBEAT = 2
+DURATION = 3
+ANGLES = 4
+
+
+class PoseWriter:
+    # Blender side, owns the shared memory
+
+    def __init__(self, joint_count, heartbeat_interval=0.5):
+
+        size = (ANGLES + joint_count) * np.dtype(np.float64).itemsize
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+
+        self.data = np.ndarray((ANGLES + joint_count,), np.float64, self.memory.buf)
+        self.data[:] = 0.0
+        self.data[HEARTBEAT] = time.monotonic()
+
+        self.heartbeat_interval = heartbeat_interval
+        self.closing = threading.Event()
+        self.heartbeat_thread = threading.Thread(target=self.beat, daemon=True)
+        self.heartbeat_thread.start()
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def beat(self):
+
+        while not self.closing.wait(self.heartbeat_interval):
+            self.data[HEARTBEAT] = time.monotonic()
+
+    def publish(self, angles, duration):
+
+        self.data[SEQUENCE] += 1  # Odd, update in progress
+        self.data[DURATION] = duration
+        self.data[ANGLES:] = angles
+        self.data[SEQUENCE] += 1  # Even, update done
+
+    def close(self):
+        # Tell the reader to stop, and release the shared memory
+
+        self.closing.set()
+        self.heartbeat_thread.join()
+
+        self.data[CLOSED] = 1.0
+        self.data = None
+
+        self.memory.close()
+
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class PoseReader:
+    # Control process side
+
+    def __init__(self, name, joint_count):
+
+        # Only the writer may unlink the shared memory, so it must not be tracked here
+        try:
+            self.memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Before Python 3.13
+            self.memory = shared_memory.SharedMemory(name=name)
+            if os.name == "posix":
+                resource_tracker.unregister(self.memory._name, "shared_memory")
+
+        self.data = np.ndarray((ANGLES + joint_count,), np.float64, self.memory.buf)
+        self.sequence = 0.0  # Of the last read
+
+    @property
+    def closed(self):
+        return self.data[CLOSED] != 0.0
+
+    def alive(self, timeout=5.0):
+        # False when the writer has not beaten for timeout seconds
+        return time.monotonic() - self.data[HEARTBEAT] < timeout
+
+    def read(self):
+        # Latest (duration, angles), or None if nothing new was published since the last read
+
+        while True:
+            sequence = self.data[SEQUENCE]
+
+            if sequence == self.sequence:
+                return None
+
+            if sequence % 2 == 1:
+                time.sleep(0)  # Writer is updating, let it finish
+                continue
+
+            values = self.data[DURATION:].copy()
+
+            if self.data[SEQUENCE] == sequence:
+                self.sequence = sequence
+                return values[0], values[1:]
+
+    def close(self):
+
+        self.data = None
+        self.memory.close()
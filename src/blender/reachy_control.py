@@ -0,0 +1,101 @@
+# Robot control loop running in its own process, so its timing does not depend on what
+# Blender is doing. Started by the addon when 'Control Process' is enabled, it reads joint
+# targets published by Blender into shared memory (reachy_bridge.py), and moves the joints
+# towards them at a fixed rate with minimum jerk interpolation, like reachy_sdk's goto.
+#
+# Started by the addon as:
+#   python reachy_control.py <shared memory name> --host <Reachy IP> --rate 100
+
+import argparse
+import time
+
+import numpy as np
+from reachy_sdk import ReachySDK
+
+from reachy_bridge import PoseReader
+from reachy_joints import JOINT_NAMES, get_joint
+
+
+def minimum_jerk(progress):
+    return progress**3 * (10.0 - 15.0 * progress + 6.0 * progress**2)
+
+
+def present_positions(joints):
+    return np.array([joint.present_position for joint in joints])
+
+
+def run(reader, joints, rate):
+
+    interval = 1.0 / rate
+
+    # Movement from start to goal positions, over duration seconds from start_time
+    start = goal = present_positions(joints)
+    start_time = time.monotonic()
+    duration = 0.0
+    moving = False
+
+    next_time = time.monotonic()
+
+    # Stop when Blender closes the bridge, or when its heartbeat stops (Blender is gone)
+    while not reader.closed and reader.alive():
+
+        now = time.monotonic()
+        target = reader.read()
+
+        if target is not None:
+            if moving:
+                # Continue from the current command, so a new target never makes a jump
+                progress = min((now - start_time) / duration, 1.0)
+                start = start + (goal - start) * minimum_jerk(progress)
+            else:
+                # Reachy may have been moved by others (e.g. Animate Pose) meanwhile
+                start = present_positions(joints)
+
+            duration, goal = target
+            start_time = now
+            moving = True
+
+        # Only command joints while moving, so other movements are not overridden when idle
+        if moving:
+            progress = 1.0 if duration <= 0.0 else (now - start_time) / duration
+            moving = progress < 1.0
+
+            positions = start + (goal - start) * minimum_jerk(min(progress, 1.0))
+
+            for joint, position in zip(joints, positions):
+                joint.goal_position = position
+
+        # Sleep until next command, on a fixed schedule
+        next_time += interval
+        time.sleep(max(next_time - time.monotonic(), 0.0))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Control loop of Reachy, following joint targets from Blender."
+    )
+    parser.add_argument("shared_memory", help="Name of the bridge's shared memory")
+    parser.add_argument("--host", default="localhost", help="Reachy's IP address")
+    parser.add_argument("--rate", type=float, default=100.0, help="Commands per second")
+    args = parser.parse_args()
+
+    reader = PoseReader(args.shared_memory, len(JOINT_NAMES))
+
+    reachy = ReachySDK(host=args.host)
+    joints = [get_joint(reachy, joint_name) for joint_name in JOINT_NAMES]
+
+    print("Control process following Blender at %.0f Hz" % args.rate)
+
+    try:
+        run(reader, joints, args.rate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+    print("Control process stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import importlib.util
+import os
+import platform
+import subprocess
+import sys
+import threading
+
+# Non standard Python packages of each feature - "python import name": "pip install name"
+FEATURES = {
+    "robot": {
+        "reachy_sdk": "reachy-sdk",
+    },
+    "gpt": {
+        "httpx": "httpx",
+        "openai": "openai",
+        "requests": "requests",
+    },
+    "voice": {
+        "gtts": "gTTS",
+        "miniaudio": "miniaudio",
+        "scipy": "scipy",
+        "sounddevice": "sounddevice",
+        "whisper": "openai-whisper",
+    },
+}
+
+# Packages of optional transcription engines, only needed when the engine is selected
+ENGINE_FEATURES = {
+    "faster-whisper": {
+        "faster_whisper": "faster-whisper",
+    },
+}
+
+
+def missing_packages(feature):
+    # Pip names of packages that are not installed. Only looks for the modules, without importing them.
+
+    packages = FEATURES[feature] if feature in FEATURES else ENGINE_FEATURES[feature]
+
+    return [
+        package_pip
+        for package_py, package_pip in packages.items()
+        if importlib.util.find_spec(package_py) is None
+    ]
+
+
+def install_package(package):
+
+    if platform.system() == "win32":
+
+        python_exe = os.path.join(sys.prefix, "bin", "python.exe")
+        target = os.path.join(sys.prefix, "lib", "site-packages")
+
+        subprocess.call([python_exe, "-m", "ensurepip"])
+        subprocess.call([python_exe, "-m", "pip", "install", "--upgrade", "pip"])
+
+        subprocess.call(
+            [python_exe, "-m", "pip", "install", "--upgrade", package, "-t", target]
+        )
+
+    else:
+        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+
+
+class Installer:
+    # Installs missing packages with pip on a background thread, so Blender stays responsive
+
+    def __init__(self):
+
+        self.thread = None
+        self.packages = []
+        self.installed = 0
+        self.current = ""
+        self.errors = []
+
+    @property
+    def installing(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def status(self):
+        # Progress text for the addon panel
+
+        if self.installing:
+            return "Installing %s (%d/%d)..." % (
+                self.current,
+                self.installed + 1,
+                len(self.packages),
+            )
+
+        if len(self.errors) > 0:
+            return "Could not install: " + ", ".join(self.errors)
+
+        return ""
+
+    def start(self, features=FEATURES):
+
+        if self.installing:
+            return
+
+        self.packages = []
+        for feature in features:
+            self.packages.extend(missing_packages(feature))
+
+        self.installed = 0
+        self.errors = []
+
+        if len(self.packages) == 0:
+            return
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+
+        for package in self.packages:
+            self.current = package
+            print(package + " not found, installing with pip...")
+
+            try:
+                install_package(package)
+                print(package + " successfully installed")
+            except (OSError, subprocess.CalledProcessError) as error:
+                print("Could not install " + package + ": " + str(error))
+                self.errors.append(package)
+
+            self.installed += 1
+
+        # Let the import system see the new packages
+        importlib.invalidate_caches()
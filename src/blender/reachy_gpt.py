@@ -1,8 +1,12 @@
+import collections
 import json
 import os
+import queue
+import threading
+import time
 from requests.exceptions import RequestException
 
-import bpy
+import httpx
 import openai
 
 
@@ -25,6 +29,25 @@ class ReachyGPT:
             "ReachyShrug",
         ]
 
+        # Interactive use: a visitor is waiting, so requests fail fast instead of being retried
+        self.connect_timeout = 3.0  # Seconds
+        self.read_timeout = 10.0  # Seconds without data from the server
+        self.deadline = 8.0  # Seconds until a fallback answer is used instead
+
+        # Hedging: a second request is sent if the first has produced no tokens within
+        # the 95th percentile of recent first token latencies
+        self.hedging = True
+        self.hedge_delay = 2.0  # Seconds, until enough latencies are measured
+        self.hedge_samples_min = 10
+        self.first_token_times = collections.deque(maxlen=100)
+
+        # Recent answers per promt, used as fallback when the deadline passes
+        self.answer_cache = collections.OrderedDict()
+        self.answer_cache_size = 100
+        self.answer_cache_lock = threading.Lock()
+
+        self.fallback_answer = "Undskyld, det kan jeg ikke svare på lige nu."
+
         self.system_prompt = """"
             You are a humanoid robot named Reachy. You can emote using the actions ReachyWave, ReachyDance, ReachyYes, ReachyNo, and ReachyShrug.
 
@@ -47,48 +70,205 @@ class ReachyGPT:
             )
             return False
 
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # The pooled client is reused, the environment variable can not change meanwhile
+        if self.client:
+            report_blender({"INFO"}, "OpenAI client is already active.")
+            return True
+
+        # Connections are kept alive in the pool, to skip the TCP and TLS handshakes
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=10, max_keepalive_connections=4, keepalive_expiry=120.0
+            )
+        )
+
+        self.client = openai.OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            max_retries=0,
+            http_client=http_client,
+        )
+
+        # Open a connection before the first visitor asks
+        threading.Thread(target=self.warm_up, daemon=True).start()
 
         return True
 
-    def get_gpt_response(self, messages, report_blender):
+    def warm_up(self):
 
         try:
-            # Request response from ChatGPT
-            response = self.client.chat.completions.create(
+            self.client.models.retrieve(self.gpt_model)
+        except openai.OpenAIError as error:
+            print("Could not warm up OpenAI connection: " + str(error))
+
+    def hedge_threshold(self):
+        # Seconds to wait for the first token, before sending a second request
+
+        if len(self.first_token_times) < self.hedge_samples_min:
+            return self.hedge_delay
+
+        times = sorted(self.first_token_times)
+
+        return times[int(0.95 * (len(times) - 1))]
+
+    def request_message(self, messages, results, first_token, cancelled):
+        # One streamed request, putting ("message", message) or ("error", text) in results
+
+        start_time = time.monotonic()
+
+        try:
+            stream = self.client.chat.completions.create(
                 model=self.gpt_model,
                 messages=messages,
                 max_tokens=self.max_tokens,
+                stream=True,
             )
 
-            if hasattr(response, "choices") and len(response.choices) > 0:
-                message = json.loads(response.choices[0].message.content)
+            content = []
 
-                if "action" not in message and "answer" not in message:
-                    report_blender(
-                        {"ERROR"}, "Message not formatted correctly: " + str(message)
-                    )
-                    return "Sorry, I couldn't generate a response."
+            try:
+                for chunk in stream:
+                    # The other request was faster
+                    if cancelled.is_set():
+                        return
+
+                    if len(chunk.choices) == 0 or not chunk.choices[0].delta.content:
+                        continue
+
+                    if not first_token.is_set():
+                        first_token.set()
+                        self.first_token_times.append(time.monotonic() - start_time)
+
+                    content.append(chunk.choices[0].delta.content)
+            finally:
+                stream.close()
 
-                return message
+            if len(content) == 0:
+                results.put(("error", "No completion choices returned."))
+                return
 
-            else:
-                report_blender({"ERROR"}, "No completion choices returned.")
-                return "Sorry, I couldn't generate a response."
+            message = json.loads("".join(content))
+
+            if (
+                not isinstance(message, dict)
+                or "action" not in message
+                or "answer" not in message
+            ):
+                results.put(
+                    ("error", "Message not formatted correctly: " + str(message))
+                )
+                return
+
+            results.put(("message", message))
+
+        except json.JSONDecodeError as error:
+            results.put(("error", "Message not formatted correctly: " + str(error)))
 
         except openai.OpenAIError as error:
-            report_blender({"ERROR"}, "OpenAI API error: " + str(error))
-            return "Sorry, there was an error with the AI service."
+            results.put(("error", "OpenAI API error: " + str(error)))
 
-        except RequestException as e:
-            report_blender({"ERROR"}, "Request error: " + str(error))
-            return "Sorry, there was a network issue."
+        except RequestException as error:
+            results.put(("error", "Request error: " + str(error)))
 
         except Exception as error:
-            report_blender({"ERROR"}, "Could not send response: " + str(error))
-            return "Sorry, something went wrong."
+            results.put(("error", "Could not send response: " + str(error)))
+
+    def fallback_response(self, promt, report_blender):
+        # Cached answer to the same promt, or a shrug. Marked, so callers can tell it apart.
+
+        with self.answer_cache_lock:
+            cached = self.answer_cache.get(promt)
+
+        if cached is not None:
+            report_blender({"WARNING"}, "Using cached answer")
+            return dict(cached, fallback=True)
+
+        return {
+            "action": "ReachyShrug",
+            "answer": self.fallback_answer,
+            "fallback": True,
+        }
 
-    def send_request(self, promt, reachy_object, report_blender):
+    def get_gpt_response(self, messages, report_blender):
+        # Response as dict with "action" and "answer", or a fallback response on errors and
+        # when the deadline passes
+
+        promt = messages[-1]["content"]
+
+        start_time = time.monotonic()
+        deadline = start_time + self.deadline
+        hedge_time = start_time + self.hedge_threshold()
+
+        results = queue.Queue()
+        first_token = threading.Event()
+        cancelled = threading.Event()
+
+        def start_request():
+            threading.Thread(
+                target=self.request_message,
+                args=[messages, results, first_token, cancelled],
+                daemon=True,
+            ).start()
+
+        # Request response from ChatGPT
+        start_request()
+        request_count = 1
+        failures = 0
+        hedged = not self.hedging
+
+        while True:
+            now = time.monotonic()
+
+            if now >= deadline:
+                report_blender({"ERROR"}, "No response within %.1f s" % self.deadline)
+                break
+
+            if not hedged and now >= hedge_time:
+                hedged = True
+
+                if not first_token.is_set():
+                    print(
+                        "No response after %.1f s, sending second request"
+                        % (now - start_time)
+                    )
+                    start_request()
+                    request_count += 1
+
+            timeout = deadline - now if hedged else min(deadline, hedge_time) - now
+
+            try:
+                result, value = results.get(timeout=timeout)
+            except queue.Empty:
+                continue
+
+            if result == "message":
+                cancelled.set()
+
+                with self.answer_cache_lock:
+                    self.answer_cache[promt] = dict(value)
+                    self.answer_cache.move_to_end(promt)
+                    if len(self.answer_cache) > self.answer_cache_size:
+                        self.answer_cache.popitem(last=False)
+
+                return value
+
+            report_blender({"ERROR"}, value)
+            failures += 1
+
+            # Retry once right away, as the hedged request
+            if not hedged:
+                hedged = True
+                start_request()
+                request_count += 1
+
+            elif failures == request_count:
+                break
+
+        cancelled.set()
+
+        return self.fallback_response(promt, report_blender)
+
+    def send_request(self, promt, report_blender):
 
         response = {"action": "", "answer": ""}  # Mock response
 
@@ -102,17 +282,31 @@ class ReachyGPT:
             )
             return response
 
+        messages = self.build_messages(promt, self.chat_history)
+        self.chat_history.append(messages[-1])
+
+        # Get response from ChatGPT, action is played by ResponseOrchestrator
+        response = self.validate_action(
+            self.get_gpt_response(messages, report_blender), report_blender
+        )
+
+        report_blender({"INFO"}, "Chosen action: " + response["action"])
+        report_blender({"INFO"}, response["answer"])
+
+        return response
+
+    def build_messages(self, promt, history):
+
         # Add system promt and recent chat history
         messages = [{"role": "system", "content": self.system_prompt}]
-        messages.extend(self.chat_history[-self.chat_history_len :])
+        messages.extend(history[-self.chat_history_len :])
 
         # Add user promt
-        message_user = {"role": "user", "content": promt}
-        messages.append(message_user)
-        self.chat_history.append(message_user)
+        messages.append({"role": "user", "content": promt})
 
-        # Get response from ChatGPT, and send action / animation to Reachy
-        response = self.get_gpt_response(messages, report_blender)
+        return messages
+
+    def validate_action(self, response, report_blender):
 
         if response["action"] not in self.action_catalouge:
             report_blender(
@@ -120,23 +314,4 @@ class ReachyGPT:
             )
             response["action"] = "ReachyShrug"
 
-        report_blender({"INFO"}, "Chosen action: " + response["action"])
-        report_blender({"INFO"}, response["answer"])
-
-        bpy.context.object.animation_data.action = bpy.data.actions.get(
-            response["action"]
-        )
-
-        if reachy_object.reachy != None:
-            # Send action to Reachy robot
-            reachy_object.animate_angles(report_blender)
-
-        else:
-            report_blender({"INFO"}, "Reachy not connected, playing animation instead.")
-
-            # Play animation
-            bpy.ops.screen.animation_cancel()
-            bpy.ops.screen.frame_jump()
-            bpy.ops.screen.animation_play()
-
         return response
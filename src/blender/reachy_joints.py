@@ -0,0 +1,43 @@
+# Mapping between the joints of Reachy and the bones of the Blender rig.
+# Kept free of Blender imports, like reachy_trajectory and reachy_bridge, so they can be
+# used by the tools running outside Blender (reachy_player.py, reachy_control.py).
+
+# (Reachy joint name, Blender bone name, sign of bone angle relative to joint angle)
+JOINTS = [
+    # Right arm
+    ("r_shoulder_pitch", "shoulder_pitch.R", -1),
+    ("r_shoulder_roll", "shoulder_roll.R", 1),
+    ("r_arm_yaw", "shoulder_yaw.R", -1),
+    ("r_elbow_pitch", "elbow_pitch.R", 1),
+    ("r_forearm_yaw", "forearm_yaw.R", -1),
+    ("r_wrist_pitch", "wrist_pitch.R", 1),
+    ("r_wrist_roll", "wrist_roll.R", 1),
+    ("r_gripper", "gripper.R", 1),
+    # Left arm
+    ("l_shoulder_pitch", "shoulder_pitch.L", 1),
+    ("l_shoulder_roll", "shoulder_roll.L", 1),
+    ("l_arm_yaw", "shoulder_yaw.L", -1),
+    ("l_elbow_pitch", "elbow_pitch.L", 1),
+    ("l_forearm_yaw", "forearm_yaw.L", 1),
+    ("l_wrist_pitch", "wrist_pitch.L", 1),
+    ("l_wrist_roll", "wrist_roll.L", 1),
+    ("l_gripper", "gripper.L", 1),
+]
+
+JOINT_NAMES = [joint_name for joint_name, _bone_name, _sign in JOINTS]
+
+
+def get_joint(reachy, joint_name):
+    # Joint object of a ReachySDK instance, e.g. reachy.r_arm.r_elbow_pitch
+
+    arm = reachy.r_arm if joint_name.startswith("r_") else reachy.l_arm
+
+    return getattr(arm, joint_name)
+
+
+def joint_positions(reachy, angles: dict):
+    # Joint name -> angle (degrees), to the joint -> angle dict used by reachy_sdk's goto
+
+    return {
+        get_joint(reachy, joint_name): angle for joint_name, angle in angles.items()
+    }
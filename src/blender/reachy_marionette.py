@@ -2,8 +2,12 @@ from enum import Enum
 import functools
 import mathutils
 import numpy as np
+import os
 import socket
+import subprocess
+import sys
 import threading
+import time
 
 import bpy
 from reachy_sdk import ReachySDK
@@ -11,11 +15,19 @@ from reachy_sdk.reachy_sdk import flush_communication
 from reachy_sdk.trajectory import goto
 from reachy_sdk.trajectory.interpolation import InterpolationMode
 
+from .reachy_bridge import PoseWriter
+from .reachy_joints import JOINTS, JOINT_NAMES, get_joint, joint_positions
+from .reachy_profiling import profiled
+from .reachy_teach import TeachRecorder, simplify_curve
+from .reachy_trajectory import play_keyframes, save_trajectories
+
 
 class State(Enum):
     IDLE = 0
     STREAMING = 1
     ANIMATING = 2
+    MIRRORING = 3
+    TEACHING = 4
 
 
 class ReachyMarionette:
@@ -23,11 +35,37 @@ class ReachyMarionette:
     def __init__(self):
 
         self.reachy = None
+        self.ip = "localhost"  # Of the last connection, probed by ensure_connection
         self.state = State.IDLE
         self.threads = []
 
         self.stream_interval = 2.0
 
+        # Latency compensation of streaming. Commands reach the robot one round trip (moving
+        # average of connection times) plus the startup of the trajectory (manual offset) late.
+        self.latency = 0.0  # Seconds
+        self.latency_smoothing = 0.2
+        self.latency_offset = 0.0  # Seconds
+        self.stream_baked = None  # ((action, frame range), angles per frame)
+
+        # Bridge to a control process, that streamed poses are published to instead
+        self.bridge = None
+        self.bridge_process = None
+        self.bridge_rate = 100.0  # Hz, commands sent by the control process
+
+        # Mirroring of robot pose onto rig
+        self.mirror_rate = 20.0  # Hz, reading joint positions from Reachy
+        # Hz, applying positions to rig (viewport refresh rate)
+        self.mirror_redraw_rate = 60.0
+        self.mirror_positions = np.zeros(len(JOINTS))  # Degrees, latest read
+        self.mirror_count = 0  # Number of reads, to detect new positions
+        self.mirror_lock = threading.Lock()
+
+        # Teach mode
+        self.teach_rate = 100.0  # Hz
+        self.teach_duration_max = 120.0  # Seconds
+        self.teach_recorder = None
+
     def __del__(self):
         self.set_state_idle()
 
@@ -82,12 +120,25 @@ class ReachyMarionette:
 
         return np.rad2deg(self.get_bones_rotation(bone, axis_rot))
 
-    def ensure_connection(self, report_blender, ip="localhost", timeout=0.1):
+    def get_angles(self):
+        # Joint name -> angle (degrees) of current pose of rig
+
+        return {
+            joint_name: self.angle_of_bone(bone_name) * sign
+            for joint_name, bone_name, sign in JOINTS
+        }
+
+    def ensure_connection(self, report_blender, ip=None, timeout=0.1):
+
+        if ip is None:
+            ip = self.ip
 
         port = 50055  # Reachy's sdk_port, only open when robot is connected
 
         try:
+            connect_time = time.monotonic()
             with socket.create_connection((ip, port), timeout):
+                self.update_latency(time.monotonic() - connect_time)
                 return True
         except OSError:
             report_blender(
@@ -104,8 +155,25 @@ class ReachyMarionette:
 
             return False
 
+    def update_latency(self, round_trip):
+
+        if self.latency == 0.0:
+            self.latency = round_trip
+        else:
+            self.latency += self.latency_smoothing * (round_trip - self.latency)
+
+    @property
+    def stream_lead(self):
+        # Seconds between sending a command and the robot starting to follow it
+        return self.latency + self.latency_offset
+
     def connect_reachy(self, report_blender, ip="localhost"):
 
+        # Latency is measured on the link to this Reachy from now on
+        if ip != self.ip:
+            self.ip = ip
+            self.latency = 0.0
+
         self.ensure_connection(report_blender)
 
         if self.reachy != None:
@@ -125,6 +193,8 @@ class ReachyMarionette:
 
         self.ensure_connection(report_blender)
 
+        self.bridge_disable(report_blender)
+
         # Try connection
         if self.reachy != None:
             self.reachy_reset_pose()
@@ -145,7 +215,9 @@ class ReachyMarionette:
             interpolation_mode=InterpolationMode.MINIMUM_JERK,
         )
 
-    def send_angles(self, report_blender, duration=1.0, threaded=False):
+    def send_angles(
+        self, report_blender, duration=1.0, threaded=False, lookahead=False
+    ):
 
         self.ensure_connection(report_blender)
 
@@ -157,27 +229,18 @@ class ReachyMarionette:
             report_blender({"ERROR"}, "Please select Armature")
             return
 
-        joint_angle_positions = {
-            # Right arm
-            self.reachy.r_arm.r_shoulder_pitch: self.angle_of_bone("shoulder_pitch.R")
-            * (-1),
-            self.reachy.r_arm.r_shoulder_roll: self.angle_of_bone("shoulder_roll.R"),
-            self.reachy.r_arm.r_arm_yaw: self.angle_of_bone("shoulder_yaw.R") * (-1),
-            self.reachy.r_arm.r_elbow_pitch: self.angle_of_bone("elbow_pitch.R"),
-            self.reachy.r_arm.r_forearm_yaw: self.angle_of_bone("forearm_yaw.R") * (-1),
-            self.reachy.r_arm.r_wrist_pitch: self.angle_of_bone("wrist_pitch.R"),
-            self.reachy.r_arm.r_wrist_roll: self.angle_of_bone("wrist_roll.R"),
-            self.reachy.r_arm.r_gripper: self.angle_of_bone("gripper.R"),
-            # Left arm
-            self.reachy.l_arm.l_shoulder_pitch: self.angle_of_bone("shoulder_pitch.L"),
-            self.reachy.l_arm.l_shoulder_roll: self.angle_of_bone("shoulder_roll.L"),
-            self.reachy.l_arm.l_arm_yaw: self.angle_of_bone("shoulder_yaw.L") * (-1),
-            self.reachy.l_arm.l_elbow_pitch: self.angle_of_bone("elbow_pitch.L"),
-            self.reachy.l_arm.l_forearm_yaw: self.angle_of_bone("forearm_yaw.L"),
-            self.reachy.l_arm.l_wrist_pitch: self.angle_of_bone("wrist_pitch.L"),
-            self.reachy.l_arm.l_wrist_roll: self.angle_of_bone("wrist_roll.L"),
-            self.reachy.l_arm.l_gripper: self.angle_of_bone("gripper.L"),
-        }
+        angles = self.lookahead_angles(duration) if lookahead else self.get_angles()
+
+        if self.bridge is not None and self.bridge_process.poll() is not None:
+            report_blender({"ERROR"}, "Control process has stopped, see console")
+            self.bridge_disable(report_blender)
+
+        if self.bridge is not None:
+            # The control process moves the joints, nothing to wait for here
+            self.bridge.publish([angles[name] for name in JOINT_NAMES], duration)
+            return
+
+        joint_angle_positions = joint_positions(self.reachy, angles)
 
         if threaded:
             thread = threading.Thread(
@@ -189,16 +252,84 @@ class ReachyMarionette:
         else:
             self.reachy_goto(joint_angle_positions, duration)
 
-    def stream_angles(self, report_blender):
+    def timeline_playing(self):
+        return any(
+            window.screen.is_animation_playing
+            for window in bpy.context.window_manager.windows
+        )
+
+    def bake_frames(self):
+        # Joint angles at every frame of the scene, as rows in the order of JOINTS
+
+        scene = bpy.context.scene
+        frame_current = scene.frame_current
+
+        frames = range(scene.frame_start, scene.frame_end + 1)
+        angles = np.empty((len(frames), len(JOINTS)))
+
+        for row, frame in enumerate(frames):
+            scene.frame_set(frame)
+            angles[row] = list(self.get_angles().values())
+
+        scene.frame_set(frame_current)
+
+        return angles
+
+    def lookahead_angles(self, duration):
+        # While the timeline plays, the pose at the playhead when a command sent now has
+        # finished, so the robot is in phase with the viewport instead of lagging behind it
+
+        animation_data = bpy.context.object.animation_data
+        action = None if animation_data is None else animation_data.action
+
+        if action is None or not self.timeline_playing():
+            return self.get_angles()
+
+        scene = bpy.context.scene
+
+        # Evaluating other frames moves the playhead, so the action is baked once instead
+        key = (action.name, scene.frame_start, scene.frame_end)
+        if self.stream_baked is None or self.stream_baked[0] != key:
+            self.stream_baked = (key, self.bake_frames())
+
+        angles = self.stream_baked[1]
+
+        fps = scene.render.fps / scene.render.fps_base
+        frame = scene.frame_current + (self.stream_lead + duration) * fps
+
+        # Playback loops over the frame range
+        position = (frame - scene.frame_start) % len(angles)
+        index = int(position)
+        index_next = min(index + 1, len(angles) - 1)
+        weight = position - index
+
+        pose = angles[index] * (1.0 - weight) + angles[index_next] * weight
+
+        return dict(zip(JOINT_NAMES, pose))
+
+    @profiled("stream_angles")
+    def stream_angles(self, report_blender, schedule):
 
         self.ensure_connection(report_blender)
 
         if self.state == State.STREAMING:
             # Duration is faster than the interval, to finish before the next thread
             self.send_angles(
-                report_blender, duration=self.stream_interval * 0.5, threaded=True
+                report_blender,
+                duration=self.stream_interval * 0.5,
+                threaded=True,
+                lookahead=True,
             )
-            return self.stream_interval  # Seconds till next function call
+
+            # Next call on a fixed grid of the monotonic clock, skipping missed calls,
+            # so timer delays do not accumulate into a drift against the timeline
+            now = time.monotonic()
+            schedule[0] += self.stream_interval
+            if schedule[0] < now:
+                missed = np.ceil((now - schedule[0]) / self.stream_interval)
+                schedule[0] += missed * self.stream_interval
+
+            return schedule[0] - now  # Seconds till next function call
         else:
             return None
 
@@ -209,66 +340,412 @@ class ReachyMarionette:
         if not self.state == State.STREAMING:
             self.state = State.STREAMING
 
+            # Bake again, in case the action was edited since the last stream
+            self.stream_baked = None
+
             # Create Blender timer
             bpy.app.timers.register(
-                functools.partial(self.stream_angles, report_blender)
+                functools.partial(
+                    self.stream_angles, report_blender, [time.monotonic()]
+                )
             )
 
         else:
             report_blender({"INFO"}, "Streaming is already in progress,")
 
-    def animate_angles(self, report_blender):
+    def bridge_enable(self, report_blender, ip="localhost"):
+        # Start control process, that moves the joints to the poses published by send_angles
+
+        if self.bridge is not None:
+            return True
+
+        self.bridge = PoseWriter(len(JOINT_NAMES))
+
+        script = os.path.join(os.path.dirname(__file__), "reachy_control.py")
+
+        try:
+            self.bridge_process = subprocess.Popen(
+                [
+                    sys.executable,
+                    script,
+                    self.bridge.name,
+                    "--host",
+                    ip,
+                    "--rate",
+                    str(self.bridge_rate),
+                ]
+            )
+        except OSError as error:
+            report_blender({"ERROR"}, "Could not start control process: " + str(error))
+            self.bridge.close()
+            self.bridge = None
+            return False
+
+        report_blender({"INFO"}, "Control process started")
+
+        return True
+
+    def bridge_disable(self, report_blender):
+
+        if self.bridge is None:
+            return
+
+        # Closing the bridge tells the control process to stop
+        self.bridge.close()
+        self.bridge = None
+
+        try:
+            self.bridge_process.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            self.bridge_process.kill()
+
+        self.bridge_process = None
+
+        report_blender({"INFO"}, "Control process stopped")
+
+    def read_positions(self):
+        # Thread reading present joint positions from Reachy, while mirroring
+
+        joints = [get_joint(self.reachy, joint_name) for joint_name in JOINT_NAMES]
+        interval = 1.0 / self.mirror_rate
+        next_time = time.monotonic()
+
+        while self.state == State.MIRRORING and self.reachy != None:
+
+            positions = np.array([joint.present_position for joint in joints])
+
+            with self.mirror_lock:
+                self.mirror_positions = positions
+                self.mirror_count += 1
+
+            next_time += interval
+            time.sleep(max(next_time - time.monotonic(), 0.0))
+
+    def mirror_bones(self, armature):
+        # Per mapped bone: index in pose.bones, unlocked axis, sign and rotation mode
+
+        pose_bones = armature.pose.bones
+        bone_indices = {bone.name: index for index, bone in enumerate(pose_bones)}
+
+        indices = []
+        axes = []
+        quaternion = []
+
+        for _joint_name, bone_name, _sign in JOINTS:
+            bone = pose_bones[bone_name]
+
+            indices.append(bone_indices[bone_name])
+            axes.append((np.array(bone.lock_rotation) == False).nonzero()[0][0])
+            quaternion.append(bone.rotation_mode == "QUATERNION")
+
+        signs = np.array([sign for _joint_name, _bone_name, sign in JOINTS])
+
+        return np.array(indices), np.array(axes), signs, np.array(quaternion)
+
+    def apply_positions(self, armature, bones, positions):
+        # Write joint positions to all mapped bones at once, inverting the mapping of send_angles
+
+        indices, axes, signs, quaternion = bones
+        pose_bones = armature.pose.bones
+
+        angles = np.deg2rad(
+            positions * signs
+        )  # Signs are +-1, so they are their own inverse
+
+        # Read all rotations, update the mapped bones, and write them back in one call each
+        eulers = np.empty(len(pose_bones) * 3, dtype=np.float32)
+        pose_bones.foreach_get("rotation_euler", eulers)
+        eulers = eulers.reshape(-1, 3)
+        eulers[indices, axes] = angles
+        pose_bones.foreach_set("rotation_euler", eulers.ravel())
+
+        if quaternion.any():
+            # Rotation about a single axis
+            quaternions = np.empty(len(pose_bones) * 4, dtype=np.float32)
+            pose_bones.foreach_get("rotation_quaternion", quaternions)
+            quaternions = quaternions.reshape(-1, 4)
+
+            rows = indices[quaternion]
+            quaternions[rows] = 0.0
+            quaternions[rows, 0] = np.cos(angles[quaternion] * 0.5)
+            quaternions[rows, axes[quaternion] + 1] = np.sin(angles[quaternion] * 0.5)
+            pose_bones.foreach_set("rotation_quaternion", quaternions.ravel())
+
+        armature.update_tag()
+
+    def mirror_angles(self, armature, bones, count_applied):
+        # Timer applying latest positions to the rig, on the main thread
+
+        if self.state != State.MIRRORING:
+            return None
+
+        with self.mirror_lock:
+            positions = self.mirror_positions
+            count = self.mirror_count
+
+        # Only update and redraw when there are new positions
+        if count != count_applied[0]:
+            count_applied[0] = count
+
+            self.apply_positions(armature, bones, positions)
+
+            for window in bpy.context.window_manager.windows:
+                for area in window.screen.areas:
+                    if area.type == "VIEW_3D":
+                        area.tag_redraw()
+
+        return 1.0 / self.mirror_redraw_rate
+
+    def mirror_angles_enable(self, report_blender):
 
         self.ensure_connection(report_blender)
 
-        if not self.state == State.ANIMATING:
-            self.state = State.ANIMATING
+        if self.reachy == None:
+            report_blender({"ERROR"}, "Reachy not connected!")
+            return False
 
-            frame_prev = 0
-            bpy.data.scenes["Scene"].show_keys_from_selected_only = False
-            bpy.data.scenes["Scene"].frame_set(frame_prev)
+        armature = bpy.context.object
+        if armature is None or armature.type != "ARMATURE":
+            report_blender({"ERROR"}, "Please select Armature")
+            return False
 
-            # Get to initial pose
-            self.send_angles(report_blender, duration=1.0, threaded=False)
+        if self.state == State.MIRRORING:
+            report_blender({"INFO"}, "Mirroring is already in progress,")
+            return False
 
-            # Iterate through all keyframes
-            while (
-                bpy.ops.screen.keyframe_jump(next=True) == {"FINISHED"}
-                and self.state == State.ANIMATING
-            ):
+        if self.state != State.IDLE:
+            report_blender({"ERROR"}, "Reachy is busy, stop " + self.state.name.lower())
+            return False
 
-                frame_diff = bpy.data.scenes["Scene"].frame_current - frame_prev
-                duration = frame_diff / bpy.context.scene.render.fps
-                frame_prev = bpy.data.scenes["Scene"].frame_current
+        self.state = State.MIRRORING
 
-                # Wait for movement to complete before moving on to next keyframe
-                self.send_angles(report_blender, duration, threaded=False)
+        thread = threading.Thread(target=self.read_positions, daemon=True)
+        self.threads.append(thread)
+        thread.start()
 
-            self.state = State.IDLE
+        # Create Blender timer
+        bpy.app.timers.register(
+            functools.partial(
+                self.mirror_angles, armature, self.mirror_bones(armature), [0]
+            )
+        )
+
+        return True
+
+    def teach_start(self, report_blender):
+        # Make arms compliant, and record their joint positions while they are moved by hand
+
+        self.ensure_connection(report_blender)
+
+        if self.reachy == None:
+            report_blender({"ERROR"}, "Reachy not connected!")
+            return False
+
+        if self.state != State.IDLE:
+            report_blender({"ERROR"}, "Reachy is busy, stop " + self.state.name.lower())
+            return False
+
+        self.state = State.TEACHING
+
+        self.reachy.turn_off_smoothly("r_arm")
+        self.reachy.turn_off_smoothly("l_arm")
+
+        joints = [get_joint(self.reachy, joint_name) for joint_name in JOINT_NAMES]
+        self.teach_recorder = TeachRecorder(
+            joints, rate=self.teach_rate, duration_max=self.teach_duration_max
+        )
+        self.teach_recorder.start()
+
+        report_blender({"INFO"}, "Teach mode: move the arms of Reachy by hand")
+
+        return True
+
+    def teach_stop(self, report_blender, action_name="ReachyTeach", tolerance=1.0):
+        # Stop recording, and store the motion as a new action with simplified keyframes
+
+        if self.teach_recorder is None:
+            return None
+
+        times, positions = self.teach_recorder.stop()
+        self.teach_recorder = None
+
+        if self.reachy != None:
+            self.reachy.turn_on("reachy")
+
+        self.state = State.IDLE
+
+        if len(times) < 2:
+            report_blender({"WARNING"}, "Nothing recorded")
+            return None
+
+        action = self.create_action(action_name, times, positions, tolerance)
+
+        report_blender(
+            {"INFO"},
+            "Recorded %d samples into '%s' with %d keyframes"
+            % (len(times) * len(JOINTS), action.name, self.count_keyframes(action)),
+        )
+
+        return action
+
+    def create_action(self, action_name, times, positions, tolerance):
+        # Action with the recorded curve of each joint, reduced to keyframes within tolerance (degrees)
+
+        armature = bpy.context.object
+        render = bpy.context.scene.render
+        frames = times * render.fps / render.fps_base
+
+        action = bpy.data.actions.new(action_name)
+
+        for column, (_joint_name, bone_name, sign) in enumerate(JOINTS):
+            bone = armature.pose.bones[bone_name]
+            axis = (np.array(bone.lock_rotation) == False).nonzero()[0][0]
+
+            keep = simplify_curve(times, positions[:, column], tolerance)
+
+            # Keys on whole frames. Of samples rounding to the same frame, the one closest
+            # to it is kept.
+            frames_keep = np.round(frames[keep])
+            order = np.argsort(np.abs(frames[keep] - frames_keep), kind="stable")
+            _frames, first = np.unique(frames_keep[order], return_index=True)
+            keep = keep[order[first]]
+
+            angles = np.deg2rad(positions[keep, column] * sign)
+
+            data_path = 'pose.bones["' + bone_name + '"]'
+
+            if bone.rotation_mode == "QUATERNION":
+                # Rotation about a single axis
+                curves = [
+                    (data_path + ".rotation_quaternion", 0, np.cos(angles * 0.5)),
+                    (
+                        data_path + ".rotation_quaternion",
+                        axis + 1,
+                        np.sin(angles * 0.5),
+                    ),
+                ]
+            else:
+                curves = [(data_path + ".rotation_euler", axis, angles)]
+
+            for curve_path, index, values in curves:
+                fcurve = action.fcurves.new(
+                    curve_path, index=index, action_group=bone_name
+                )
+
+                # Insert all keyframes in one call, as interleaved (frame, value) pairs
+                points = np.column_stack((np.round(frames[keep]), values)).astype(
+                    np.float32
+                )
+                fcurve.keyframe_points.add(len(points))
+                fcurve.keyframe_points.foreach_set("co", points.ravel())
+
+                # The tolerance of the simplification holds for straight lines between keys
+                for point in fcurve.keyframe_points:
+                    point.interpolation = "LINEAR"
+
+                fcurve.update()
+
+        if armature.animation_data is None:
+            armature.animation_data_create()
+
+        armature.animation_data.action = action
+
+        return action
+
+    def count_keyframes(self, action):
+        return sum(len(fcurve.keyframe_points) for fcurve in action.fcurves)
+
+    def bake_keyframes(self, report_blender):
+        # Go through keyframes of the active action, and collect the pose at each one.
+        # Returns list of (duration to reach pose in seconds, joint name -> angle)
+
+        if bpy.context.object.type != "ARMATURE":
+            report_blender({"ERROR"}, "Please select Armature")
+            return []
+
+        scene = bpy.data.scenes["Scene"]
+        frame_current = scene.frame_current
+
+        frame_prev = 0
+        scene.show_keys_from_selected_only = False
+        scene.frame_set(frame_prev)
+
+        # Get to initial pose
+        keyframes = [(1.0, self.get_angles())]
+
+        # Iterate through all keyframes
+        while bpy.ops.screen.keyframe_jump(next=True) == {"FINISHED"}:
+
+            frame_diff = scene.frame_current - frame_prev
+            duration = frame_diff / bpy.context.scene.render.fps
+            frame_prev = scene.frame_current
+
+            keyframes.append((duration, self.get_angles()))
+
+        scene.frame_set(frame_current)
+
+        return keyframes
+
+    def play_keyframes(self, keyframes, cancelled=None, start_time=None):
+        # Send baked keyframes to Reachy, on a monotonic timeline starting at start_time.
+        # Blocks until done, so it can run on a thread without touching Blender.
+
+        if self.reachy == None:
+            return
+
+        self.state = State.ANIMATING
+
+        def should_stop():
+            return self.state != State.ANIMATING or (
+                cancelled is not None and cancelled.is_set()
+            )
+
+        def send(angles, duration):
+            self.reachy_goto(joint_positions(self.reachy, angles), duration)
+
+        play_keyframes(keyframes, send, should_stop, start_time)
+
+        self.state = State.IDLE
+
+    def export_trajectories(self, report_blender, file_path: str):
+        # Bake every action to keyframes, and save them for the headless player
+
+        animation_data = bpy.context.object.animation_data
+        if animation_data is None:
+            animation_data = bpy.context.object.animation_data_create()
+
+        action_active = animation_data.action
+
+        trajectories = {}
+
+        for action in bpy.data.actions:
+            animation_data.action = action
+            trajectories[action.name] = self.bake_keyframes(report_blender)
+
+        animation_data.action = action_active
+
+        save_trajectories(file_path, trajectories, bpy.context.scene.render.fps)
+
+        report_blender(
+            {"INFO"},
+            "Exported " + str(len(trajectories)) + " actions to '" + file_path + "'",
+        )
+
+    def animate_angles(self, report_blender):
+
+        self.ensure_connection(report_blender)
+
+        if self.reachy == None:
+            report_blender({"ERROR"}, "Reachy not connected!")
+            return
+
+        if not self.state == State.ANIMATING:
+            self.play_keyframes(self.bake_keyframes(report_blender))
 
         else:
             report_blender({"INFO"}, "Animation is already in progress,")
 
     def reachy_reset_pose(self):
-        joint_angles = {
-            # Right arm
-            self.reachy.r_arm.r_shoulder_pitch: 0,
-            self.reachy.r_arm.r_shoulder_roll: 0,
-            self.reachy.r_arm.r_arm_yaw: 0,
-            self.reachy.r_arm.r_elbow_pitch: 0,
-            self.reachy.r_arm.r_forearm_yaw: 0,
-            self.reachy.r_arm.r_wrist_pitch: 0,
-            self.reachy.r_arm.r_wrist_roll: 0,
-            self.reachy.r_arm.r_gripper: 0,
-            # Left arm
-            self.reachy.l_arm.l_shoulder_pitch: 0,
-            self.reachy.l_arm.l_shoulder_roll: 0,
-            self.reachy.l_arm.l_arm_yaw: 0,
-            self.reachy.l_arm.l_elbow_pitch: 0,
-            self.reachy.l_arm.l_forearm_yaw: 0,
-            self.reachy.l_arm.l_wrist_pitch: 0,
-            self.reachy.l_arm.l_wrist_roll: 0,
-            self.reachy.l_arm.l_gripper: 0,
-        }
+        joint_angles = joint_positions(self.reachy, dict.fromkeys(JOINT_NAMES, 0))
 
         self.reachy_goto(joint_angles, 1.0)
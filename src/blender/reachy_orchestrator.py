@@ -0,0 +1,157 @@
+import threading
+import time
+
+import bpy
+
+
+class ResponseHandle:
+    # One handle to wait for, or cancel, both motion and speech of a response
+
+    def __init__(self, start_time):
+
+        self.start_time = start_time  # Monotonic time of the shared timeline origin
+        self.cancelled = threading.Event()
+
+        self.threads = []
+        self.cancel_callbacks = []
+
+    @property
+    def done(self):
+        return all(not thread.is_alive() for thread in self.threads)
+
+    def wait(self, timeout=None):
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        for thread in self.threads:
+            thread.join(
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            )
+
+        return self.done
+
+    def cancel(self):
+
+        self.cancelled.set()
+
+        for callback in self.cancel_callbacks:
+            callback()
+
+
+class ResponseOrchestrator:
+    # Plays the action and the spoken answer of a ChatGPT response at the same time,
+    # scheduled on a shared monotonic timeline
+
+    def __init__(self, reachy, reachy_voice):
+
+        self.reachy = reachy
+        self.reachy_voice = reachy_voice
+
+        # Seconds from the timeline origin to the start of motion and speech.
+        # Positive speech_offset lets the gesture lead, negative lets speech lead.
+        self.motion_offset = 0.0
+        self.speech_offset = 0.0
+
+        # Time given to set up both before the timeline starts
+        self.lead_time = 0.1
+
+        self.handle = None
+
+    @property
+    def active(self):
+        return self.handle is not None and not self.handle.done
+
+    def cancel(self):
+
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def play(self, response, report_blender, speak=True, language="da"):
+
+        # No response (e.g. empty promt or no client), so the rig's action is kept
+        action = bpy.data.actions.get(response["action"])
+        if action is None:
+            return None
+
+        self.cancel()
+
+        bpy.context.object.animation_data.action = action
+
+        # Baking reads the rig, so it is done here on the main thread before the timeline starts
+        keyframes = []
+        if self.reachy.reachy != None:
+            keyframes = self.reachy.bake_keyframes(report_blender)
+
+        start_time = time.monotonic() + self.lead_time
+        handle = ResponseHandle(start_time)
+
+        # Speech
+        if speak and self.reachy_voice is not None and len(response["answer"]) > 0:
+            self.reachy_voice.speak_audio(
+                response["answer"],
+                language=language,
+                start_time=start_time + self.speech_offset,
+            )
+            handle.cancel_callbacks.append(self.reachy_voice.stop_speaking)
+
+            thread = threading.Thread(target=self.reachy_voice.speech.wait, daemon=True)
+            handle.threads.append(thread)
+            thread.start()
+
+        # Motion
+        if len(keyframes) > 0:
+            thread = threading.Thread(
+                target=self.play_motion, args=[keyframes, handle], daemon=True
+            )
+            handle.threads.append(thread)
+            thread.start()
+
+        elif self.reachy.reachy == None:
+            report_blender({"INFO"}, "Reachy not connected, playing animation instead.")
+
+            delay = max(start_time + self.motion_offset - time.monotonic(), 0.0)
+            bpy.app.timers.register(self.play_animation, first_interval=delay)
+            handle.cancel_callbacks.append(self.cancel_animation)
+
+        self.handle = handle
+
+        return handle
+
+    def play_motion(self, keyframes, handle):
+
+        motion_start = handle.start_time + self.motion_offset
+
+        # Sleep until motion starts, unless cancelled first
+        if handle.cancelled.wait(max(motion_start - time.monotonic(), 0.0)):
+            return
+
+        self.reachy.play_keyframes(keyframes, handle.cancelled, start_time=motion_start)
+
+    def screen_context(self):
+        # Timers run without a window, which the screen operators need
+
+        window = bpy.context.window_manager.windows[0]
+
+        return bpy.context.temp_override(window=window, screen=window.screen)
+
+    def play_animation(self):
+
+        if self.handle is None or self.handle.cancelled.is_set():
+            return None
+
+        # Play animation
+        with self.screen_context():
+            bpy.ops.screen.animation_cancel()
+            bpy.ops.screen.frame_jump()
+            bpy.ops.screen.animation_play()
+
+        return None  # Do not repeat timer
+
+    def cancel_animation(self):
+
+        if bpy.app.timers.is_registered(self.play_animation):
+            bpy.app.timers.unregister(self.play_animation)
+
+        with self.screen_context():
+            bpy.ops.screen.animation_cancel()
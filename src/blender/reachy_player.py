@@ -0,0 +1,197 @@
+# Headless player of joint trajectories exported by the addon ('Export Actions'),
+# for running Reachy without Blender, e.g. unattended kiosk deployments.
+#
+# Run from this folder:
+#   python reachy_player.py reachy_trajectories.json --host <Reachy IP> --play ReachyWave
+#   python reachy_player.py reachy_trajectories.json --play ReachyWave ReachyDance --loop
+#   python reachy_player.py reachy_trajectories.json --listen 50100
+#
+# With --listen, actions are triggered over a local TCP socket, one command per line:
+#   play <action> [<action> ...]   Play actions in order, after the current one,
+#                                  then resume --loop if it was ended by stop
+#   stop                           Stop current action, clear the playlist and end --loop
+#   list                           List available actions
+#   quit                           Stop the player
+
+import argparse
+import queue
+import socketserver
+import threading
+
+from reachy_sdk import ReachySDK
+from reachy_sdk.trajectory import goto
+from reachy_sdk.trajectory.interpolation import InterpolationMode
+
+from reachy_joints import JOINT_NAMES, joint_positions
+from reachy_trajectory import load_trajectories, play_keyframes
+
+
+class TrajectoryPlayer:
+
+    def __init__(self, reachy, trajectories):
+
+        self.reachy = reachy
+        self.trajectories = trajectories
+
+        self.playlist = queue.Queue()
+        self.stopped = threading.Event()  # Stops current action
+        self.closed = threading.Event()  # Stops the player
+
+        self.idle_exit = False  # Return from run() when the playlist is done
+
+        self.loop_names = []  # Replayed whenever the playlist runs dry, while looping
+        self.looping = False
+
+    def send(self, angles, duration):
+
+        goto(
+            goal_positions=joint_positions(self.reachy, angles),
+            duration=duration,
+            interpolation_mode=InterpolationMode.MINIMUM_JERK,
+        )
+
+    def should_stop(self):
+        return self.stopped.is_set() or self.closed.is_set()
+
+    def enqueue(self, names):
+
+        unknown = [name for name in names if name not in self.trajectories]
+        if len(unknown) > 0:
+            return "Unknown action: " + ", ".join(unknown)
+
+        for name in names:
+            self.playlist.put(name)
+
+        return "Queued " + ", ".join(names)
+
+    def play(self, names):
+        # Queue actions on request, which also resumes a loop ended by stop
+
+        reply = self.enqueue(names)
+        self.looping = len(self.loop_names) > 0
+
+        return reply
+
+    def stop(self):
+
+        # End looping and clear playlist, then stop the current action
+        self.looping = False
+
+        while not self.playlist.empty():
+            self.playlist.get_nowait()
+
+        self.stopped.set()
+
+    def run(self):
+        # Play queued actions until closed
+
+        while not self.closed.is_set():
+
+            if self.looping and self.playlist.empty():
+                self.enqueue(self.loop_names)
+
+            try:
+                name = self.playlist.get(timeout=0.1)
+            except queue.Empty:
+                if self.idle_exit:
+                    return
+                continue
+
+            self.stopped.clear()
+            print("Playing " + name)
+
+            play_keyframes(self.trajectories[name], self.send, self.should_stop)
+
+    def reset_pose(self):
+        self.send(dict.fromkeys(JOINT_NAMES, 0), 1.0)
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+
+        player = self.server.player
+
+        for line in self.rfile:
+            command, *args = line.decode("utf-8").split() or [""]
+
+            if command == "play" and len(args) > 0:
+                reply = player.play(args)
+            elif command == "stop":
+                player.stop()
+                reply = "Stopped"
+            elif command == "list":
+                reply = " ".join(player.trajectories)
+            elif command == "quit":
+                player.stop()
+                player.closed.set()
+                reply = "Bye"
+            else:
+                reply = "Unknown command: " + line.decode("utf-8").strip()
+
+            self.wfile.write((reply + "\n").encode("utf-8"))
+
+            if player.closed.is_set():
+                return
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Play joint trajectories exported from Blender on Reachy."
+    )
+    parser.add_argument("trajectories", help="JSON file exported by the addon")
+    parser.add_argument("--host", default="localhost", help="Reachy's IP address")
+    parser.add_argument("--play", nargs="+", default=[], help="Actions to play")
+    parser.add_argument("--loop", action="store_true", help="Repeat --play actions")
+    parser.add_argument(
+        "--listen", type=int, help="Port of local socket for triggering actions"
+    )
+    args = parser.parse_args()
+
+    trajectories = load_trajectories(args.trajectories)
+    print("Loaded actions: " + ", ".join(trajectories))
+
+    unknown = [name for name in args.play if name not in trajectories]
+    if len(unknown) > 0:
+        parser.error("Unknown action: " + ", ".join(unknown))
+
+    reachy = ReachySDK(host=args.host)
+    reachy.turn_on("reachy")
+
+    player = TrajectoryPlayer(reachy, trajectories)
+
+    # Without looping or a socket, exit when the given actions are done
+    player.idle_exit = not args.loop and args.listen is None
+
+    if args.loop:
+        player.loop_names = args.play
+        player.looping = len(args.play) > 0
+    else:
+        player.enqueue(args.play)
+
+    server = None
+    if args.listen is not None:
+        # Only accept local connections
+        server = socketserver.ThreadingTCPServer(
+            ("127.0.0.1", args.listen), CommandHandler
+        )
+        server.daemon_threads = True
+        server.player = player
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print("Listening for commands on port " + str(args.listen))
+
+    try:
+        player.run()
+    except KeyboardInterrupt:
+        player.stop()
+    finally:
+        if server is not None:
+            server.shutdown()
+
+        player.reset_pose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# Opt-in profiling of addon operators and timers, for finding out where time and memory
+# went on a user's machine. Time is measured with cProfile, allocations with tracemalloc.
+# The addon writes the report to a text datablock.
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+
+class Profiler:
+
+    def __init__(self):
+
+        self.active = False
+        self.running = False  # Only one cProfile can be enabled at a time
+        self.directory = os.path.join(
+            os.path.expanduser("~"), ".cache", "reachy_marionette", "profiles"
+        )
+        self.limit = 25  # Lines per section of the report
+
+        # Name -> cProfile.Profile, collecting all calls of a session
+        self.profiles = {}
+        self.calls = {}  # Name -> number of calls
+        self.durations = {}  # Name -> total seconds
+        self.snapshot = None  # Allocations at start of session
+        self.start_time = 0.0
+
+    def start(self):
+
+        self.profiles = {}
+        self.calls = {}
+        self.durations = {}
+
+        tracemalloc.start()
+        self.snapshot = tracemalloc.take_snapshot()
+
+        self.start_time = time.perf_counter()
+        self.active = True
+
+    def run(self, name, function, *args):
+        # Call function, profiled if a session is active
+
+        if not self.active or self.running:
+            return function(*args)
+
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+
+        self.running = True
+        start_time = time.perf_counter()
+
+        try:
+            return profile.runcall(function, *args)
+        finally:
+            self.durations[name] = (
+                self.durations.get(name, 0.0) + time.perf_counter() - start_time
+            )
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.running = False
+
+    def stop(self):
+        # End session. Returns text report, and paths of .prof files (one per profiled name)
+
+        self.active = False
+        session_duration = time.perf_counter() - self.start_time
+
+        snapshot = None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+
+        lines = ["ReachyMarionette profile, %.1f s session" % session_duration, ""]
+        paths = []
+
+        # Slowest first
+        names = sorted(
+            self.profiles, key=lambda name: self.durations[name], reverse=True
+        )
+
+        for name in names:
+            path = os.path.join(self.directory, stamp + "_" + name + ".prof")
+            self.profiles[name].dump_stats(path)
+            paths.append(path)
+
+            lines.append(
+                "%s: %d calls, %.3f s total, %.1f ms per call"
+                % (
+                    name,
+                    self.calls[name],
+                    self.durations[name],
+                    self.durations[name] / self.calls[name] * 1000,
+                )
+            )
+
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profiles[name], stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.limit)
+            lines.append(stream.getvalue())
+
+        if len(names) == 0:
+            lines.append("No profiled operators or timers were run")
+            lines.append("")
+
+        if snapshot is not None:
+            lines.append("Allocations since start of session (largest growth first):")
+            lines.extend(self.allocation_lines(snapshot))
+
+        lines.append("")
+        lines.extend("Saved " + path for path in paths)
+
+        self.profiles = {}
+        self.snapshot = None
+
+        return "\n".join(lines), paths
+
+    def allocation_lines(self, snapshot):
+
+        # Leave out memory used by the profiling itself
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+
+        differences = snapshot.filter_traces(filters).compare_to(
+            self.snapshot.filter_traces(filters), "lineno"
+        )
+
+        return [str(difference) for difference in differences[: self.limit]]
+
+
+profiler = Profiler()
+
+
+def profiled(name):
+    # Decorator profiling a function under name, while a session is active.
+    # Blender checks the argument count of operator methods, so the wrapper keeps it.
+
+    def decorator(function):
+
+        argument_count = function.__code__.co_argcount
+
+        if argument_count == 2:
+
+            def wrapper(self, argument):
+                return profiler.run(name, function, self, argument)
+
+        elif argument_count == 3:
+
+            def wrapper(self, argument, argument_other):
+                return profiler.run(name, function, self, argument, argument_other)
+
+        else:
+
+            def wrapper(*args):
+                return profiler.run(name, function, *args)
+
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,108 @@
+# Teach mode: recording of joint positions while the arms of Reachy are moved by hand,
+# and reduction of the recorded curves to a few keyframes.
+
+import threading
+import time
+
+import numpy as np
+
+
+def simplify_curve(times: np.ndarray, values: np.ndarray, tolerance):
+    # Ramer-Douglas-Peucker keyframe reduction. Returns sorted indices of samples to keep,
+    # so that linear interpolation between them stays within tolerance of every sample.
+
+    count = len(values)
+
+    if count <= 2:
+        return np.arange(count)
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    segments = [(0, count - 1)]
+
+    while len(segments) > 0:
+        first, last = segments.pop()
+
+        if last - first < 2:
+            continue
+
+        # Deviation of samples from the straight line between the segment end points
+        inner_times = times[first + 1 : last]
+        slope = (values[last] - values[first]) / (times[last] - times[first])
+        line = values[first] + slope * (inner_times - times[first])
+        deviation = np.abs(values[first + 1 : last] - line)
+
+        index = int(np.argmax(deviation))
+
+        if deviation[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+
+            segments.append((first, split))
+            segments.append((split, last))
+
+    return np.flatnonzero(keep)
+
+
+class TeachRecorder:
+    # Samples joint positions at a fixed rate into a preallocated buffer
+
+    def __init__(self, joints, rate=100.0, duration_max=60.0):
+
+        self.joints = joints  # Objects with a present_position (degrees)
+        self.rate = rate
+
+        samples_max = int(rate * duration_max)
+        self.times = np.zeros(samples_max)
+        self.positions = np.zeros((samples_max, len(joints)))
+        self.count = 0
+
+        self.stopped = threading.Event()
+        self.stopped.set()
+        self.thread = None
+
+    @property
+    def recording(self):
+        return not self.stopped.is_set()
+
+    def start(self):
+
+        self.count = 0
+        self.stopped.clear()
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Returns recorded sample times (seconds from start) and positions
+
+        self.stopped.set()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        return self.times[: self.count], self.positions[: self.count]
+
+    def run(self):
+
+        interval = 1.0 / self.rate
+        start_time = time.monotonic()
+        next_time = start_time
+
+        while self.count < len(self.times):
+
+            self.times[self.count] = time.monotonic() - start_time
+            self.positions[self.count] = [
+                joint.present_position for joint in self.joints
+            ]
+            self.count += 1
+
+            # Sleep until next sample, on a fixed schedule
+            next_time += interval
+            if self.stopped.wait(max(next_time - time.monotonic(), 0.0)):
+                return
+
+        print("Teach recording reached its maximum duration")
+        self.stopped.set()
@@ -0,0 +1,71 @@
+# Baked joint trajectories, and their timed playback. Shared by the addon and the
+# headless player (reachy_player.py).
+#
+# A trajectory is a list of keyframes: (duration to reach pose in seconds, joint name -> angle)
+
+import json
+import time
+
+TRAJECTORY_FORMAT_VERSION = 1
+
+
+def save_trajectories(file_path: str, trajectories: dict, fps):
+
+    data = {
+        "version": TRAJECTORY_FORMAT_VERSION,
+        "fps": fps,
+        "actions": {
+            name: [
+                {"duration": duration, "angles": angles}
+                for duration, angles in keyframes
+            ]
+            for name, keyframes in trajectories.items()
+        },
+    }
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=1)
+
+
+def load_trajectories(file_path: str):
+    # Action name -> keyframes
+
+    with open(file_path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    if data.get("version") != TRAJECTORY_FORMAT_VERSION:
+        raise ValueError(
+            "Unsupported trajectory format version: " + str(data.get("version"))
+        )
+
+    return {
+        name: [(keyframe["duration"], keyframe["angles"]) for keyframe in keyframes]
+        for name, keyframes in data["actions"].items()
+    }
+
+
+def play_keyframes(keyframes, send, should_stop=None, start_time=None):
+    # Send keyframes on a monotonic timeline starting at start_time.
+    # send(angles, duration) must block until the movement is done (like reachy_sdk's goto).
+
+    if start_time is None:
+        start_time = time.monotonic()
+
+    keyframe_time = start_time
+
+    for duration, angles in keyframes:
+
+        if should_stop is not None and should_stop():
+            return False
+
+        # Each movement ends on the timeline, so delays do not accumulate
+        keyframe_time += duration
+        duration_left = keyframe_time - time.monotonic()
+
+        if duration_left <= 0.0:
+            continue
+
+        # Wait for movement to complete before moving on to next keyframe
+        send(angles, duration_left)
+
+    return True
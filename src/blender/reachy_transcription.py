@@ -0,0 +1,271 @@
+from abc import ABC, abstractmethod
+import re
+import threading
+import time
+
+
+class TranscriptionEngine(ABC):
+    # Speech-to-text backend running on CPU. Audio is either a file path, or
+    # mono float32 samples at 16 kHz.
+
+    name = ""
+
+    def __init__(self, model_name="small", threads=None, beam_size=None):
+
+        self.model_name = model_name
+        self.threads = threads  # None uses the backend default
+        # None uses the backend default, 1 is greedy decoding
+        self.beam_size = beam_size
+
+    @abstractmethod
+    def transcribe(self, audio, language="en"):
+        pass
+
+
+class WhisperEngine(TranscriptionEngine):
+    # Reference openai-whisper model, PyTorch in fp32
+
+    name = "whisper"
+
+    def __init__(self, model_name="small", threads=None, beam_size=None):
+
+        super().__init__(model_name, threads, beam_size)
+
+        import torch
+        import whisper
+
+        if threads:
+            torch.set_num_threads(threads)
+
+        self.model = whisper.load_model(model_name, device="cpu")
+
+    def transcribe(self, audio, language="en"):
+
+        options = {}
+        if self.beam_size is not None:
+            options["beam_size"] = self.beam_size
+
+        result = self.model.transcribe(audio, language=language, fp16=False, **options)
+
+        return result["text"]
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    # Whisper converted to CTranslate2 with int8 quantized weights
+
+    name = "faster-whisper"
+
+    def __init__(
+        self, model_name="small", threads=None, beam_size=None, compute_type="int8"
+    ):
+
+        super().__init__(model_name, threads, beam_size)
+
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=threads or 0,
+        )
+
+    def transcribe(self, audio, language="en"):
+
+        options = {}
+        if self.beam_size is not None:
+            options["beam_size"] = self.beam_size
+
+        segments, _info = self.model.transcribe(audio, language=language, **options)
+
+        # Segments are decoded lazily while iterating
+        return "".join(segment.text for segment in segments)
+
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+
+def create_engine(name, model_name="small", threads=None, beam_size=None):
+
+    if name not in ENGINES:
+        raise ValueError("Unknown transcription engine '" + str(name) + "'")
+
+    return ENGINES[name](model_name, threads=threads, beam_size=beam_size)
+
+
+def normalize_word(word: str):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def merge_overlap(words: list, new_words: list, overlap_max=12):
+    # Append new_words to words, skipping the longest prefix of new_words that
+    # repeats the end of words (the audio overlap between two windows)
+
+    tail = [normalize_word(word) for word in words[-overlap_max:]]
+    head = [normalize_word(word) for word in new_words[:overlap_max]]
+
+    for length in range(min(len(tail), len(head)), 0, -1):
+        if tail[-length:] == head[:length]:
+            return words + new_words[length:]
+
+    return words + new_words
+
+
+class StreamingTranscriber:
+    # Transcribes a running AudioCapture in overlapping windows on a worker thread.
+    # Completed windows are committed as audio arrives, so when the recording ends
+    # only the last (short) window is left to decode.
+
+    def __init__(
+        self,
+        capture,
+        transcribe,
+        language="en",
+        samplerate=16000,
+        window=6.0,
+        overlap=1.0,
+        step=1.0,
+        partials=False,
+        partial_load=0.5,
+    ):
+
+        self.capture = capture
+        self.transcribe = transcribe  # Callable (audio, language) -> text
+        self.language = language
+        self.samplerate = samplerate
+
+        # Window sizes in capture frames
+        self.window = int(window * capture.samplerate)
+        self.overlap = int(overlap * capture.samplerate)
+        self.step = step
+
+        # Partials are opt-in, as every decode is a full encoder pass (Whisper pads audio
+        # to 30 s). They are spaced by their decode time, so at most partial_load of the
+        # worker's time goes to partials.
+        self.partials = partials
+        self.partial_load = partial_load
+
+        self.words = []  # Committed words
+        self.partial_words = []  # Hypothesis of the open window, decoded step by step
+        self.partial = ""  # Latest hypothesis, committed words plus the open window
+        self.position = None  # Capture frame where the open window starts
+
+        self.finished = threading.Event()
+        self.cancelled = threading.Event()
+        self.thread = None
+
+    def start(self):
+
+        self.words = []
+        self.partial_words = []
+        self.partial = ""
+        self.position = None
+        self.finished.clear()
+        self.cancelled.clear()
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def finish(self):
+        # Signal that the recording has ended, and wait for the final window
+
+        self.finished.set()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        return " ".join(self.words)
+
+    def cancel(self):
+        # Stop without decoding the remaining audio
+
+        self.cancelled.set()
+        self.finish()
+
+    def decode(self, start, stop):
+
+        audio = self.capture.read(start, stop, samplerate=self.samplerate)
+
+        if len(audio) == 0:
+            return []
+
+        return self.transcribe(audio, self.language).split()
+
+    def set_partial(self, words):
+
+        text = " ".join(words)
+
+        if text != self.partial:
+            self.partial = text
+            print("Partial transcription: " + text)
+
+    def run(self):
+
+        partial_frame = None
+        partial_time = 0.0  # Monotonic time of the next partial
+
+        while not self.finished.wait(self.step):
+
+            capture = self.capture
+
+            # Still waiting for speech
+            if capture.use_vad and not capture.vad.triggered:
+                continue
+
+            if self.position is None:
+                self.position = capture.start_frame
+
+            available = capture.buffer.frames_written
+
+            if available - self.position >= self.window:
+                # Commit the full window, keeping the overlap for the next one
+                stop = self.position + self.window
+                self.words = merge_overlap(self.words, self.decode(self.position, stop))
+                self.set_partial(self.words)
+
+                self.position = stop - self.overlap
+
+                self.partial_words = []
+                partial_frame = None
+
+            elif (
+                self.partials
+                and available != partial_frame
+                and time.monotonic() >= partial_time
+                and not self.finished.is_set()
+            ):
+                # Only audio added since the last partial is decoded (with overlap), so a
+                # partial is never a full window decode that finish() has to wait for
+                start = self.position
+                if partial_frame is not None:
+                    start = max(self.position, partial_frame - self.overlap)
+
+                decode_start = time.monotonic()
+                self.partial_words = merge_overlap(
+                    self.partial_words, self.decode(start, available)
+                )
+                self.set_partial(merge_overlap(self.words, self.partial_words))
+
+                partial_frame = available
+
+                decode_time = time.monotonic() - decode_start
+                partial_time = time.monotonic() + decode_time * (
+                    1.0 / self.partial_load - 1.0
+                )
+
+        if self.cancelled.is_set():
+            return
+
+        # Final window
+        if self.position is None:
+            if self.capture.use_vad and not self.capture.vad.triggered:
+                return
+
+            self.position = self.capture.start_frame
+
+        self.words = merge_overlap(self.words, self.decode(self.position, None))
+        self.set_partial(self.words)
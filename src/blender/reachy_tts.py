@@ -0,0 +1,360 @@
+from collections import OrderedDict
+import hashlib
+import io
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+import zipfile
+
+from gtts import gTTS
+import numpy as np
+import sounddevice as sd
+
+from .reachy_audio import decode_mp3, load_wav, resample
+
+
+def split_sentences(text: str, length_min=20):
+    # Split text after sentence punctuation, merging fragments shorter than length_min
+
+    sentences = []
+
+    for part in re.split(r"(?<=[.!?:;])\s+", text.strip()):
+        if len(sentences) > 0 and len(sentences[-1]) < length_min:
+            sentences[-1] += " " + part
+        elif len(part) > 0:
+            sentences.append(part)
+
+    return sentences
+
+
+class GTTSSynthesizer:
+    # Google Translate text-to-speech, requires network
+
+    name = "gtts"
+
+    def decode(self, tts: gTTS):
+
+        # Load into .mp3 format
+        mp3_fp = io.BytesIO()
+        tts.write_to_fp(mp3_fp)
+
+        # Decode in-process to float32
+        return decode_mp3(mp3_fp.getvalue())
+
+    def __call__(self, text: str, language="en"):
+        return self.decode(gTTS(text=text, lang=language))
+
+
+class Pyttsx3Synthesizer:
+    # Offline text-to-speech through the voices of the operating system (SAPI5, NSSpeechSynthesizer, eSpeak)
+
+    name = "pyttsx3"
+
+    def __init__(self):
+
+        import pyttsx3
+
+        self.pyttsx3 = pyttsx3
+        self.lock = threading.Lock()
+
+    def select_voice(self, engine, language):
+
+        for voice in engine.getProperty("voices"):
+            languages = [str(item).lower() for item in voice.languages]
+
+            if (
+                any(language in item for item in languages)
+                or language in voice.id.lower()
+            ):
+                engine.setProperty("voice", voice.id)
+                return
+
+    def __call__(self, text: str, language="en"):
+
+        file_descriptor, file_path = tempfile.mkstemp(suffix=".wav")
+        os.close(file_descriptor)
+
+        try:
+            # The engine is not thread safe, so a new one is used for each phrase
+            with self.lock:
+                engine = self.pyttsx3.init()
+                self.select_voice(engine, language)
+                engine.save_to_file(text, file_path)
+                engine.runAndWait()
+
+            samples, samplerate = load_wav(file_path)
+
+        finally:
+            os.remove(file_path)
+
+        return samples, samplerate
+
+
+SYNTHESIZERS = {
+    GTTSSynthesizer.name: GTTSSynthesizer,
+    Pyttsx3Synthesizer.name: Pyttsx3Synthesizer,
+}
+
+
+class SpeechCache:
+    # Two tier cache of synthesized speech as decoded float32 PCM, keyed by (text, language).
+    # Recently used clips are kept in memory, all clips are stored on disk,
+    # and both tiers evict the least recently used clips when over their size budget.
+
+    directory_default = os.path.join(
+        os.path.expanduser("~"), ".cache", "reachy_marionette", "tts"
+    )
+
+    def __init__(
+        self,
+        directory=directory_default,
+        memory_max=64 * 1024**2,
+        disk_max=512 * 1024**2,
+    ):
+
+        self.directory = directory
+        self.memory_max = memory_max  # Bytes
+        self.disk_max = disk_max  # Bytes
+
+        self.memory = OrderedDict()  # key -> (samples, samplerate)
+        self.memory_size = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, text: str, language: str):
+        return hashlib.sha1(
+            (language + "\n" + text.strip()).encode("utf-8")
+        ).hexdigest()
+
+    def file_path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, text: str, language: str):
+        # Returns (samples, samplerate), or None on a cache miss
+
+        key = self.key(text, language)
+
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+
+        file_path = self.file_path(key)
+
+        try:
+            with np.load(file_path) as data:
+                entry = (data["samples"], int(data["samplerate"]))
+
+            # Mark as recently used for disk eviction
+            os.utime(file_path)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+        self.put_memory(key, entry)
+
+        return entry
+
+    def put(self, text: str, language: str, samples: np.ndarray, samplerate):
+
+        key = self.key(text, language)
+        entry = (samples.astype(np.float32, copy=False), int(samplerate))
+
+        self.put_memory(key, entry)
+
+        # Write to a temporary file first, so readers never see a partial file.
+        # Every writer has its own, as the same key can be written by two threads at once.
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.savez(file, samples=entry[0], samplerate=entry[1])
+
+            os.replace(temp_path, self.file_path(key))
+        except OSError:
+            os.remove(temp_path)
+            raise
+
+        self.evict_disk()
+
+    def put_memory(self, key, entry):
+
+        with self.lock:
+            if key in self.memory:
+                self.memory_size -= self.memory.pop(key)[0].nbytes
+
+            self.memory[key] = entry
+            self.memory_size += entry[0].nbytes
+
+            while self.memory_size > self.memory_max and len(self.memory) > 1:
+                _key, (samples, _samplerate) = self.memory.popitem(last=False)
+                self.memory_size -= samples.nbytes
+
+    def evict_disk(self):
+
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".npz"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(file[1] for file in files)
+
+        # Oldest first
+        for _mtime, file_size, file_path in sorted(files):
+            if size <= self.disk_max:
+                break
+
+            try:
+                os.remove(file_path)
+                size -= file_size
+            except OSError:
+                pass
+
+    def clear(self):
+
+        with self.lock:
+            self.memory.clear()
+            self.memory_size = 0
+
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".npz"):
+                os.remove(entry.path)
+
+
+class SpeechPipeline:
+    # Speaks text sentence by sentence. A worker synthesizes the next sentence while the
+    # current one plays, and all sentences are played through one continuous output stream.
+
+    def __init__(self, synthesize, samplerate=24000, queue_size=2):
+
+        # Callable (text, language) -> (samples, samplerate)
+        self.synthesize = synthesize
+        self.samplerate = samplerate
+        self.queue_size = queue_size
+
+        self.chunks = None
+        self.chunk = None
+        self.chunk_pos = 0
+
+        self.stream = None
+        self.start_time = None  # Monotonic time where playback may start
+        self.cancelled = threading.Event()
+
+        self.finished = threading.Event()
+        self.finished.set()
+
+    @property
+    def speaking(self):
+        return not self.finished.is_set()
+
+    def speak(self, text: str, language="en", start_time=None):
+        # Synthesis starts right away, playback is held back until start_time (monotonic)
+
+        self.cancel()
+
+        sentences = split_sentences(text)
+
+        if len(sentences) == 0:
+            return
+
+        # Every utterance has its own queue and events, so a worker that is still
+        # synthesizing a cancelled utterance can not leak sentences into the next one,
+        # and the aborted stream of the last utterance can not mark this one as finished
+        self.chunks = queue.Queue(maxsize=self.queue_size)
+        self.chunk = None
+        self.start_time = start_time
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+
+        worker = threading.Thread(
+            target=self.produce,
+            args=[sentences, language, self.chunks, self.cancelled],
+            daemon=True,
+        )
+        worker.start()
+
+        self.stream = sd.OutputStream(
+            samplerate=self.samplerate,
+            channels=1,
+            dtype="float32",
+            callback=self.callback,
+            finished_callback=self.finished.set,  # Bound to this utterance's event
+        )
+        self.stream.start()
+
+    def produce(self, sentences, language, chunks, cancelled):
+
+        for sentence in sentences:
+            if cancelled.is_set():
+                return
+
+            try:
+                samples, samplerate = self.synthesize(sentence, language)
+            except Exception as error:
+                print("Could not synthesize '" + sentence + "': " + str(error))
+                continue
+
+            self.put(chunks, cancelled, resample(samples, samplerate, self.samplerate))
+
+        # End of speech
+        self.put(chunks, cancelled, None)
+
+    def put(self, chunks, cancelled, chunk):
+
+        # Wait for room in the queue, unless speech is cancelled
+        while not cancelled.is_set():
+            try:
+                chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def callback(self, outdata, frames, time_info, status):
+
+        if self.start_time is not None and time.monotonic() < self.start_time:
+            outdata[:] = 0
+            return
+
+        written = 0
+
+        while written < frames:
+
+            if self.chunk is None or self.chunk_pos >= len(self.chunk):
+                try:
+                    self.chunk = self.chunks.get_nowait()
+                    self.chunk_pos = 0
+                except queue.Empty:
+                    # Next sentence is not synthesized yet, play silence
+                    outdata[written:] = 0
+                    return
+
+                if self.chunk is None:
+                    # End of speech
+                    outdata[written:] = 0
+                    raise sd.CallbackStop
+
+            count = min(frames - written, len(self.chunk) - self.chunk_pos)
+            outdata[written : written + count, 0] = self.chunk[
+                self.chunk_pos : self.chunk_pos + count
+            ]
+
+            self.chunk_pos += count
+            written += count
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def cancel(self):
+
+        self.cancelled.set()
+
+        if self.stream is not None:
+            self.stream.abort()
+            self.stream.close()
+            self.stream = None
+
+        self.finished.set()
@@ -1,83 +1,190 @@
-import io
 import numpy as np
 import os
-import scipy.io.wavfile as wav
-import sounddevice as sd
 import threading
-import time
 
-from gtts import gTTS
-import pydub
-import whisper
+from .reachy_audio import AudioCapture, load_wav, resample, save_wav
+from .reachy_transcription import StreamingTranscriber, create_engine
+from .reachy_tts import SYNTHESIZERS, SpeechCache, SpeechPipeline, split_sentences
+
+# Sample rate expected by the transcription engines
+TRANSCRIPTION_SAMPLERATE = 16000
 
 
 class ReachyVoice:
 
-    def __init__(self):
+    def __init__(self, engine="whisper", threads=None, beam_size=None):
 
-        model_name = "small"
+        self.engine = None
+        self.set_engine(
+            engine, model_name="small", threads=threads, beam_size=beam_size
+        )
 
-        print("Initiating Whisper model: '" + model_name + "'...")
-        self.model = whisper.load_model(model_name)
-        print("Whisper model ready")
+        self.capture = AudioCapture(samplerate=44100, channels=1, duration_max=10.0)
 
         self.recording = False
+        self.record_thread = None
+        self.recorded = None  # Last recording, mono float32 at capture rate
+
+        # Voice activity detection, thresholds can be tuned on self.capture.vad
+        self.use_vad = False
+        self.listen_timeout = 10.0  # Seconds to wait for speech to start
+
+        # Transcribe while recording, instead of after the recording has ended
+        self.use_streaming = False
+        self.use_partials = False  # Also decode the open window, for live feedback
+        self.transcriber = None
+
+        # Text-to-speech, answers are synthesized and played sentence by sentence
+        self.synthesizer = None
+        self.speech_cache = None
+        self.set_synthesizer("gtts")
+
+        self.speech = SpeechPipeline(self.synthesize)
+
+    def set_engine(self, name, model_name="small", threads=None, beam_size=None):
+        # Loading a model takes seconds, so it is only reloaded when needed
+
+        if (
+            self.engine is not None
+            and self.engine.name == name
+            and self.engine.model_name == model_name
+            and self.engine.threads == threads
+        ):
+            self.engine.beam_size = beam_size
+            return
 
-    def record_audio(self, file_path: str, duartion_max=10.0):
+        print("Initiating transcription engine: '" + name + "' (" + model_name + ")...")
+        self.engine = create_engine(name, model_name, threads, beam_size)
+        print("Transcription engine ready")
 
-        print("Recording...")
+    def record_audio(self, file_path: str, duration_max=10.0):
 
-        samplerate = 44100
-        audio_data = sd.rec(
-            int(duartion_max * samplerate),
-            samplerate=samplerate,
-            channels=1,
-            dtype="float32",
-        )
+        print("Listening..." if self.use_vad else "Recording...")
 
-        start_time = time.time()
+        self.capture.start(duration_max, use_vad=self.use_vad)
 
-        while self.recording:
-            # Wait until the recording is finished or stopped
+        timeout = duration_max + 1.0  # Margin for stream startup
+        if self.use_vad:
+            timeout += self.listen_timeout
 
-            current_time = time.time()
-            elapsed_time = current_time - start_time
+        # Sleep until the recording is stopped or duration_max is reached
+        self.capture.wait(timeout=timeout)
+        self.capture.stop()
 
-            if elapsed_time >= duartion_max:
-                self.recording = False
+        self.recording = False
 
-        # Make sure recording is stopped, and data is trimmed to actual length (instead of duration_max)
-        sd.stop()
-        audio_data_trimmed = audio_data[: int(samplerate * elapsed_time)]
+        # Leading and trailing silence is trimmed, so Whisper has less audio to decode
+        self.recorded = self.capture.get_audio(trim=self.use_vad)[:, 0]
 
         # Clear file
         open(file_path, "wb").close()
 
-        # Write new data
-        wav.write(file_path, samplerate, audio_data_trimmed)
+        # Write new data, transcription reads self.recorded instead of the file
+        save_wav(file_path, self.recorded, self.capture.samplerate)
         print("Recording saved to " + str(file_path))
 
-    def start_recording(self, report_blender, file_path: str, duration_max):
+    def start_recording(
+        self, report_blender, file_path: str, duration_max, language="en"
+    ):
 
         if not self.recording:
             self.recording = True
 
-            thread = threading.Thread(
+            if self.use_streaming:
+                self.transcriber = StreamingTranscriber(
+                    self.capture,
+                    self.transcribe_samples,
+                    language=language,
+                    samplerate=TRANSCRIPTION_SAMPLERATE,
+                    partials=self.use_partials,
+                )
+                self.transcriber.start()
+
+            self.record_thread = threading.Thread(
                 target=self.record_audio, args=[file_path, duration_max]
             )
-            thread.start()
+            self.record_thread.start()
 
         else:
             report_blender({"INFO"}, "Recording is already in progress...")
 
     def stop_recording(self):
+
+        self.capture.request_stop()
+
+        # Wait for the recording to be written, so it can be transcribed right after
+        if self.record_thread is not None:
+            self.record_thread.join()
+            self.record_thread = None
+
         self.recording = False
 
+    def cancel_recording(self):
+        # Stop recording, and drop the streaming transcription
+
+        self.stop_recording()
+
+        if self.transcriber is not None:
+            self.transcriber.cancel()
+            self.transcriber = None
+
+    @property
+    def partial_transcription(self):
+
+        if self.transcriber is None:
+            return ""
+
+        return self.transcriber.partial
+
+    def transcribe_samples(self, audio: np.ndarray, language="en"):
+        # Audio must be mono float32 at 16 kHz
+        return self.engine.transcribe(audio, language=language)
+
+    def finish_transcription(self, report_blender):
+        # Wait for the streaming transcriber to decode the remaining audio
+
+        if self.transcriber is None:
+            report_blender({"ERROR"}, "No streaming transcription in progress.")
+            return ""
+
+        transcription = self.transcriber.finish()
+        self.transcriber = None
+
+        if len(transcription) == 0:
+            report_blender({"INFO"}, "No speech detected")
+            return ""
+
+        report_blender({"INFO"}, "Transcription: " + transcription)
+
+        return transcription
+
+    def transcribe_recording(self, report_blender, language="en"):
+        # Transcribe the last recording straight from memory
+
+        if self.recorded is None:
+            report_blender({"ERROR"}, "No recording to transcribe.")
+            return ""
+
+        # Voice activity detection heard no speech, so nothing was kept
+        if len(self.recorded) == 0:
+            report_blender({"INFO"}, "No speech detected")
+            return ""
+
+        audio = resample(
+            self.recorded, self.capture.samplerate, TRANSCRIPTION_SAMPLERATE
+        )
+        transcription = self.transcribe_samples(audio, language=language)
+
+        report_blender({"INFO"}, "Transcription: " + transcription)
+
+        return transcription
+
     def transcribe_audio(self, file_path: str, report_blender, language="en"):
 
         if os.path.exists(file_path):
-            result = self.model.transcribe(str(file_path), language=language)
-            transcription = result["text"]
+            # Decoded in-process, instead of the FFmpeg call of the engines
+            audio, _samplerate = load_wav(file_path, TRANSCRIPTION_SAMPLERATE)
+            transcription = self.transcribe_samples(audio, language=language)
 
             report_blender({"INFO"}, "Transcription: " + transcription)
 
@@ -88,32 +195,50 @@ class ReachyVoice:
                 {"ERROR"}, "File path '" + str(file_path) + "' does not exist."
             )
 
-    def gtts_to_numpy(self, tts: gTTS):
+    def set_synthesizer(self, name):
+        # Synthesizers have separate caches, as their voices differ
 
-        # Load into .mp3 format
-        mp3_fp = io.BytesIO()
-        tts.write_to_fp(mp3_fp)
-        mp3_fp.seek(0)  # Set buffer position at beginning
+        self.synthesizer = SYNTHESIZERS[name]()
+        self.speech_cache = SpeechCache(
+            directory=os.path.join(SpeechCache.directory_default, name)
+        )
 
-        # Read mp3 data
-        audio = pydub.AudioSegment.from_file(mp3_fp, format="mp3")
+    def synthesize(self, text: str, language="en"):
 
-        # Convert to NumPy array
-        samples = np.array(audio.get_array_of_samples())
+        cached = self.speech_cache.get(text, language)
 
-        # Normalize the audio data to the range [-1, 1]
-        samples = samples / (2**15)
+        if cached is not None:
+            return cached
 
-        return samples, audio.frame_rate
+        # Generate audio
+        audio, frame_rate = self.synthesizer(text, language)
+        self.speech_cache.put(text, language, audio, frame_rate)
+
+        return audio, frame_rate
+
+    def presynthesize(self, phrases, language="en"):
+        # Fill the cache with known phrases in the background, so they play instantly later.
+        # Speech is synthesized per sentence, so phrases are cached per sentence as well.
+
+        def run():
+            for phrase in phrases:
+                for sentence in split_sentences(phrase):
+                    self.synthesize(sentence, language)
+
+            print("Pre-synthesized " + str(len(phrases)) + " phrases")
 
-    def speak_audio(self, text: str, language="en"):
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+
+        return thread
+
+    def speak_audio(self, text: str, language="en", start_time=None):
 
         if len(text) == 0:
             return
 
-        # Generate audio
-        tts = gTTS(text=text, lang=language)
-
-        audio, frame_rate = self.gtts_to_numpy(tts)
+        # Returns right away, speech starts when the first sentence is synthesized
+        self.speech.speak(text, language, start_time=start_time)
 
-        sd.play(audio, frame_rate)
+    def stop_speaking(self):
+        self.speech.cancel()